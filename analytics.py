@@ -0,0 +1,99 @@
+"""Figures and insights for the Analytics tab
+
+build_figures turns dashboard statistics (see user_stats.summarize_stats)
+into the four Plotly figures the tab shows. Building them means a pandas
+DataFrame and a Plotly Express call per chart, so the app memoizes the
+result in the read cache under the user's write version and only builds
+again after a new dream.
+
+pandas and Plotly are the app's heaviest imports, so the chart builders
+import them when first called; a process that never draws a chart never
+loads them.
+"""
+
+# Shared by every chart so they sit on the app's dark background
+CHART_LAYOUT = {
+    "plot_bgcolor": "rgba(0,0,0,0)",
+    "paper_bgcolor": "rgba(0,0,0,0)",
+    "font_color": "white"
+}
+NO_GRID = {"xaxis": dict(showgrid=False), "yaxis": dict(showgrid=False)}
+
+
+def mood_figure(mood_distribution):
+    import pandas as pd
+    import plotly.express as px
+
+    mood_df = pd.DataFrame(list(mood_distribution.items()), columns=['Mood', 'Count'])
+    fig = px.pie(mood_df, values='Count', names='Mood', color_discrete_sequence=px.colors.qualitative.Set3)
+    fig.update_layout(**CHART_LAYOUT)
+    return fig
+
+
+def keyword_figure(keywords):
+    import pandas as pd
+    import plotly.express as px
+
+    keywords_df = pd.DataFrame(keywords, columns=['Keyword', 'Frequency'])
+    fig = px.bar(keywords_df, x='Keyword', y='Frequency', color='Frequency', color_continuous_scale='viridis')
+    fig.update_layout(**CHART_LAYOUT, **NO_GRID)
+    return fig
+
+
+def monthly_figure(monthly_counts):
+    import pandas as pd
+    import plotly.express as px
+
+    monthly_df = pd.DataFrame(list(monthly_counts.items()), columns=['Month', 'Dreams'])
+    monthly_df['Month'] = pd.to_datetime(monthly_df['Month'])
+    monthly_df = monthly_df.sort_values('Month')
+
+    fig = px.line(monthly_df, x='Month', y='Dreams', markers=True, line_shape='spline')
+    fig.update_layout(**CHART_LAYOUT, **NO_GRID)
+    fig.update_traces(line_color='#4ECDC4', marker_color='#FF6B6B')
+    return fig
+
+
+def emotion_figure(emotions):
+    import pandas as pd
+    import plotly.express as px
+
+    emotions_df = pd.DataFrame(emotions, columns=['Emotion', 'Frequency'])
+    fig = px.bar(emotions_df, x='Emotion', y='Frequency', color='Frequency', color_continuous_scale='plasma')
+    fig.update_layout(**CHART_LAYOUT, **NO_GRID)
+    return fig
+
+
+# Statistics field, heading and builder, in display order
+CHARTS = [
+    ("mood_distribution", "#### &#128522; Mood Distribution", mood_figure),
+    ("most_common_keywords", "#### &#128273; Most Common Dream Symbols", keyword_figure),
+    ("monthly_counts", "#### &#128197; Dreams Over Time", monthly_figure),
+    ("most_common_emotions", "#### &#10084;&#65039; Emotional Patterns", emotion_figure)
+]
+
+
+def build_figures(stats):
+    """(heading, figure) for each chart that has data"""
+    return [(heading, build(stats[field])) for field, heading, build in CHARTS if stats.get(field)]
+
+
+def dream_insights(stats):
+    """Short observations about the user's journal"""
+    insights = []
+    if stats['total_dreams'] >= 5:
+        insights.append(f"&#127775; You're an active dreamer with {stats['total_dreams']} recorded dreams!")
+
+    if stats['days_since_last'] == 0:
+        insights.append("&#127381; You recorded a dream today - great job staying consistent!")
+    elif stats['days_since_last'] <= 3:
+        insights.append(f"&#9203; It's been {stats['days_since_last']} days since your last dream - keep up the good work!")
+
+    if stats['most_common_keywords']:
+        top_symbol = stats['most_common_keywords'][0][0]
+        insights.append(f"&#128302; '{top_symbol}' appears frequently in your dreams - this might be a significant symbol for you.")
+
+    if stats['mood_distribution']:
+        dominant_mood = max(stats['mood_distribution'].items(), key=lambda x: x[1])[0]
+        insights.append(f"&#128522; Your dreams tend to be {dominant_mood}, which may reflect your subconscious emotional state.")
+    return insights
@@ -2,18 +2,25 @@ import streamlit as st
 import os
 import re
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
-import pymongo
-from mistralai import Mistral
 from dotenv import load_dotenv
 import time
-from collections import Counter
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import base64
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import LLMResponseCache, cache_key
+from conversation_memory import ConversationMemory
+from llm_backends import DEFAULT_MODEL, create_llm_backend
+from resilience import CircuitBreaker, ResilientBackend, RetryPolicy
+from llm_routing import LLMMetrics, load_routes
+from jobs import JobQueue, JobQueueFull
+from crisis import GLOBAL_RESOURCE, MENTAL_HEALTH_RESOURCES, detect_crisis, find_country
+from user_stats import MOOD_OPTIONS, summarize_stats
+from read_cache import ReadCache
+from journal_io import FORMATS, import_dreams, write_export
+from exports import FORMATS as DOWNLOAD_FORMATS, ExportCache, content_key, dream_record, serialize
+from analytics import CHARTS as ANALYTICS_CHARTS, build_figures, dream_insights
+from markup import MOOD_BADGE, SHARE_LINK, STATS_CARD, THEME_CSS, chat_message
+from io import BytesIO, TextIOWrapper
 
 # Load environment variables
 load_dotenv()
@@ -28,311 +35,241 @@ st.set_page_config(
 
 # Custom CSS for dreamy interface
 def load_css():
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
-    
-    /* Main background with gradient */
-    .stApp {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        font-family: 'Poppins', sans-serif;
-    }
-    
-    /* Hide Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Custom title styling */
-    .dream-title {
-        font-size: 4rem;
-        font-weight: 700;
-        text-align: center;
-        background: linear-gradient(45deg, #FFD700, #FF69B4, #87CEEB);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 1rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        animation: glow 2s ease-in-out infinite alternate;
-    }
-    
-    @keyframes glow {
-        from { filter: drop-shadow(0 0 5px rgba(255, 215, 0, 0.5)); }
-        to { filter: drop-shadow(0 0 20px rgba(255, 105, 180, 0.8)); }
-    }
-    
-    /* Quote styling - only shown on homepage */
-    .dream-quote {
-        font-size: 1.3rem;
-        font-style: italic;
-        text-align: center;
-        color: #E6E6FA;
-        margin: 2rem 0;
-        padding: 1rem;
-        border-radius: 15px;
-        background: rgba(255, 255, 255, 0.1);
-        backdrop-filter: blur(10px);
-        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(45deg, #FF6B6B, #4ECDC4);
-        color: white;
-        border: none;
-        border-radius: 25px;
-        padding: 0.8rem 2rem;
-        font-size: 1.1rem;
-        font-weight: 600;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px 0 rgba(31, 38, 135, 0.2);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 8px 25px 0 rgba(31, 38, 135, 0.3);
-        background: linear-gradient(45deg, #FF5252, #26C6DA);
-    }
-    
-    /* Card styling */
-    .dream-card {
-        background: rgba(255, 255, 255, 0.15);
-        backdrop-filter: blur(10px);
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 1rem;
-        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-        border: 1px solid rgba(255, 255, 255, 0.18);
-    }
-    
-    /* Hide empty dream cards */
-    .dream-card:empty {
-        display: none;
-    }
-    
-    /* Stats card styling */
-    .stats-card {
-        background: rgba(255, 255, 255, 0.2);
-        backdrop-filter: blur(15px);
-        border-radius: 15px;
-        padding: 1.5rem;
-        text-align: center;
-        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-        border: 1px solid rgba(255, 255, 255, 0.18);
-        transition: transform 0.3s ease;
-    }
-    
-    .stats-card:hover {
-        transform: translateY(-5px);
-    }
-    
-    .stat-number {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #FFD700;
-        margin-bottom: 0.5rem;
-    }
-    
-    .stat-label {
-        font-size: 1rem;
-        color: #E6E6FA;
-        font-weight: 400;
-    }
-    
-    /* Input field styling */
-    .stTextInput > div > div > input {
-        background: rgba(255, 255, 255, 0.2);
-        border: 1px solid rgba(255, 255, 255, 0.3);
-        border-radius: 15px;
-        color: white;
-        padding: 0.8rem;
-    }
-    
-    .stTextArea > div > div > textarea {
-        background: rgba(255, 255, 255, 0.2);
-        border: 1px solid rgba(255, 255, 255, 0.3);
-        border-radius: 15px;
-        color: white;
-        padding: 0.8rem;
-    }
-    
-    /* Chat message styling */
-    .chat-message {
-        padding: 1rem;
-        border-radius: 15px;
-        margin: 1rem 0;
-        animation: fadeIn 0.5s ease-in;
-    }
-    
-    .user-message {
-        background: rgba(255, 107, 107, 0.3);
-        margin-left: 2rem;
-        border-left: 4px solid #FF6B6B;
-    }
-    
-    .analyst-message {
-        background: rgba(78, 205, 196, 0.3);
-        margin-right: 2rem;
-        border-left: 4px solid #4ECDC4;
-    }
-    
-    .therapist-message {
-        background: rgba(255, 182, 193, 0.3);
-        margin-right: 2rem;
-        border-left: 4px solid #FFB6C1;
-    }
-    
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    /* Dream figure animation */
-    .dream-figure {
-        font-size: 8rem;
-        text-align: center;
-        animation: float 3s ease-in-out infinite;
-    }
-    
-    @keyframes float {
-        0%, 100% { transform: translateY(0px); }
-        50% { transform: translateY(-20px); }
-    }
-    
-    /* Success/error messages */
-    .success-message {
-        background: rgba(76, 175, 80, 0.3);
-        color: #E8F5E8;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-    }
-    
-    .error-message {
-        background: rgba(244, 67, 54, 0.3);
-        color: #FFEBEE;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-    }
-    
-    /* Share buttons */
-    .share-buttons {
-        display: flex;
-        gap: 10px;
-        justify-content: center;
-        margin: 1rem 0;
-    }
-    
-    .share-btn {
-        background: linear-gradient(45deg, #FF6B6B, #4ECDC4);
-        border: none;
-        border-radius: 25px;
-        padding: 0.8rem 1.5rem;
-        color: white !important;
-        text-decoration: none;
-        transition: all 0.3s ease;
-        font-weight: 600;
-        cursor: pointer;
-        display: inline-block;
-        text-align: center;
-        box-shadow: 0 4px 15px 0 rgba(31, 38, 135, 0.2);
-        margin: 0.5rem;
-    }
-    
-    .share-btn:hover {
-        background: linear-gradient(45deg, #FF5252, #26C6DA);
-        transform: translateY(-3px);
-        box-shadow: 0 8px 25px 0 rgba(31, 38, 135, 0.3);
-        color: white !important;
-        text-decoration: none;
-    }
-    
-    /* Mood indicator */
-    .mood-indicator {
-        display: inline-block;
-        padding: 0.3rem 0.8rem;
-        border-radius: 20px;
-        font-size: 0.9rem;
-        font-weight: 500;
-        margin: 0.2rem;
-    }
-    
-    .mood-positive { background: rgba(76, 175, 80, 0.4); color: #E8F5E8; }
-    .mood-neutral { background: rgba(255, 193, 7, 0.4); color: #FFF3C4; }
-    .mood-negative { background: rgba(244, 67, 54, 0.4); color: #FFEBEE; }
-    .mood-mysterious { background: rgba(156, 39, 176, 0.4); color: #F3E5F5; }
-    
-    /* White text for better visibility */
-    .white-text {
-        color: white !important;
-        font-weight: bold;
+    """Inject the theme stylesheet
+
+    st.html sends style-only content outside the page layout, and the
+    compacted sheet is over the client's message cache threshold, so after
+    the first run each rerun sends a hash instead of the stylesheet.
+    """
+    st.html(THEME_CSS)
+
+# MongoDB connection
+# The database modules import pymongo, so they are imported where used:
+# the homepage and sign-in form render without loading the driver, which
+# the connection manager imports on its own thread.
+def provision_database(mongo_client):
+    """Create indexes and report queries that still scan; a list of problems
+
+    Runs once per process, in the background, after the first connection.
+    """
+    from db_indexes import check_query_plans, ensure_indexes
+
+    db = mongo_client["dream_analyst"]
+    problems = ensure_indexes(db)
+    if os.getenv("CHECK_QUERY_PLANS", "true").lower() in ("1", "true", "yes"):
+        problems += check_query_plans(db)
+    return problems
+
+def mongo_client_options():
+    """Pool and timeout settings for the MongoClient; unset variables keep pymongo's defaults"""
+    settings = {
+        "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+        "minPoolSize": "MONGO_MIN_POOL_SIZE",
+        "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+        "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+        "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+        "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS"
     }
+    options = {"serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))}
+    for option, variable in settings.items():
+        if os.getenv(variable):
+            options[option] = int(os.getenv(variable))
+    return options
+
+@st.cache_resource
+def get_mongo_manager():
+    """Process-wide MongoDB connection, established and health-checked in the background"""
+    from mongo_connection import MongoConnectionManager
     
-    /* Email display styling - FIXED */
-    .user-email {
-        color: white !important;
-        font-weight: bold;
-        font-size: 1.1rem;
-    }
+    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    if mongo_uri == "mongodb://localhost:27017":
+        mongo_uri = None
+    
+    return MongoConnectionManager(
+        mongo_uri,
+        mongo_client_options(),
+        health_interval=float(os.getenv("MONGO_HEALTH_CHECK_SECONDS", "30")),
+        on_connect=provision_database
+    ).start()
+
+@st.cache_resource
+def build_repositories(_mongo_client):
+    """Repositories over the connected client
+
+    The manager never replaces a client once it has connected, so one
+    cached pair serves the whole process.
+    """
+    from dream_schema import DreamCodec
+    from repository import DreamRepository, UserRepository
     
-    /* Remove empty box */
-    .empty-box {
-        display: none;
-    }
+    db = _mongo_client["dream_analyst"]
+    codec = DreamCodec(
+        codec=os.getenv("DREAM_COMPRESSION", "zlib"),
+        min_bytes=int(os.getenv("DREAM_COMPRESSION_MIN_BYTES", "1024"))
+    )
+    return (
+        UserRepository(db["users"], get_query_timings()),
+        DreamRepository(db["dreams"], get_query_timings(), get_read_cache(), codec)
+    )
+
+# Pages that need the database wait this long for the first connection attempt
+DB_CONNECT_WAIT_SECONDS = float(os.getenv("DB_CONNECT_WAIT_SECONDS", "5"))
+
+def initialize_clients(db_wait=DB_CONNECT_WAIT_SECONDS):
+    """MongoDB repositories and the configured LLM backend
+
+    The repositories are None while the database is unreachable; they
+    appear on a later rerun once the background connection succeeds.
+    """
+    mongo_client = get_mongo_manager().get_client(db_wait)
+    user_repo, dream_repo = build_repositories(mongo_client) if mongo_client else (None, None)
+    return mongo_client, user_repo, dream_repo, get_llm_client()
+
+@st.cache_resource
+def get_llm_client():
+    """The configured LLM backend with retries and circuit breaking"""
+    llm_client = create_llm_backend()
+    if llm_client:
+        # Breakers live as long as the process, so every session fails fast together
+        llm_client = ResilientBackend(
+            llm_client,
+            RetryPolicy(
+                max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+                base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+                max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+                timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+            ),
+            breaker_factory=lambda: CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+            )
+        )
     
-    /* Ensure all text in buttons is white */
-    a.share-btn, a.share-btn:visited, a.share-btn:hover {
-        color: white !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    return llm_client
 
-# MongoDB connection function
 @st.cache_resource
-def connect_to_mongodb():
-    """Connect to MongoDB with caching"""
-    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+def get_read_cache():
+    """Dashboard read cache shared across sessions; dream writes invalidate a user's entries"""
+    return ReadCache(
+        max_entries=int(os.getenv("READ_CACHE_MAX_ENTRIES", "2048")),
+        ttl_seconds=int(os.getenv("READ_CACHE_TTL_SECONDS", "300"))
+    )
+
+@st.cache_resource
+def get_query_timings():
+    """Database query timings shared across sessions"""
+    from repository import QueryTimings
     
-    if not mongo_uri or mongo_uri == "mongodb://localhost:27017":
-        return None
+    return QueryTimings()
 
-    connection_options = [
-        {},
-        {"tls": True, "tlsAllowInvalidCertificates": True}
-    ]
+@st.cache_resource
+def get_llm_executor():
+    """Thread pool shared across sessions for running LLM calls concurrently"""
+    max_workers = int(os.getenv("LLM_MAX_WORKERS", "8"))
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
 
-    for i, options in enumerate(connection_options):
-        try:
-            client = pymongo.MongoClient(mongo_uri, **options, serverSelectionTimeoutMS=5000)
-            client.admin.command('ping')
-            return client
-        except Exception:
-            continue
-    return None
+@st.cache_resource
+def get_job_queue():
+    """Background worker pool for post-analysis work, shared across sessions"""
+    return JobQueue(
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        max_queue=int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    )
+
+# Call types whose responses are cached; the deterministic JSON tasks by default
+LLM_CACHE_CALL_TYPES = {
+    call_type.strip() for call_type in os.getenv("LLM_CACHE_CALL_TYPES", "mood,keywords,structured").split(",")
+    if call_type.strip()
+}
+
+@st.cache_resource
+def get_llm_cache():
+    """LLM response cache shared across sessions"""
+    return LLMResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+        ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+        db_path=os.getenv("LLM_CACHE_DB") or None
+    )
+
+MODEL_ROUTES = load_routes()
 
-# Initialize connections
 @st.cache_resource
-def initialize_clients():
-    """Initialize MongoDB and Mistral clients"""
-    mongo_client = connect_to_mongodb()
-    db = None
-    users_collection = None
-    dreams_collection = None
+def get_llm_metrics():
+    """Per-task latency and token metrics shared across sessions"""
+    return LLMMetrics()
+
+def cached_chat_complete(llm_client, call_type, messages, temperature, response_format=None):
+    """Return the response text of a chat completion for a task
+
+    The models routed to the call type are tried in order, and the cache is
+    used for opted-in call types.
+    """
+    cache = get_llm_cache() if call_type in LLM_CACHE_CALL_TYPES else None
+    metrics = get_llm_metrics()
+    last_error = None
+    
+    for model in MODEL_ROUTES.get(call_type, [DEFAULT_MODEL]):
+        key = None
+        if cache is not None:
+            key = cache_key(model, messages, temperature, response_format)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        usage = {}
+        started = time.monotonic()
+        try:
+            content = llm_client.complete(model, messages, temperature, response_format, usage=usage)
+        except Exception as e:
+            metrics.record(call_type, model, time.monotonic() - started, ok=False)
+            last_error = e
+            continue
+        metrics.record(call_type, model, time.monotonic() - started, **usage)
+        
+        if cache is not None:
+            # Don't pin malformed JSON in the cache for the whole TTL
+            if response_format and response_format.get("type") == "json_object":
+                try:
+                    json.loads(content)
+                except ValueError:
+                    return content
+            cache.set(key, content)
+        
+        return content
     
-    if mongo_client:
-        db = mongo_client["dream_analyst"]
-        users_collection = db["users"]
-        dreams_collection = db["dreams"]
+    raise last_error
+
+# Render replies token by token instead of waiting for the full response
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+def stream_chat_completion(llm_client, call_type, messages, temperature=0.7):
+    """Yield response text chunks for a task as they arrive from the backend's streaming API
+
+    Falls back to the next routed model only if a model fails before its
+    first chunk.
+    """
+    metrics = get_llm_metrics()
+    last_error = None
     
-    mistral_api_key = os.getenv("MISTRAL_API_KEY")
-    mistral_client = None
-    if mistral_api_key:
-        mistral_client = Mistral(api_key=mistral_api_key)
+    for model in MODEL_ROUTES.get(call_type, [DEFAULT_MODEL]):
+        usage = {}
+        started = time.monotonic()
+        first_token_latency = None
+        try:
+            for chunk in llm_client.stream(model, messages, temperature, usage=usage):
+                if first_token_latency is None:
+                    first_token_latency = time.monotonic() - started
+                yield chunk
+        except Exception as e:
+            metrics.record(call_type, model, time.monotonic() - started, ok=False)
+            if first_token_latency is not None:
+                raise
+            last_error = e
+            continue
+        metrics.record(call_type, model, time.monotonic() - started, first_token_latency=first_token_latency, **usage)
+        return
     
-    return mongo_client, users_collection, dreams_collection, mistral_client
+    raise last_error
 
 # Authentication functions
 def is_valid_password(password):
@@ -358,9 +295,9 @@ def is_valid_email(email):
     pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
     return re.match(pattern, email) is not None
 
-def register_user(users_collection, email, password):
+def register_user(user_repo, email, password):
     """Register a new user"""
-    if users_collection.find_one({"email": email}):
+    if user_repo.find_by_email(email, view="exists"):
         return False, "Email already registered"
     
     hashed_password = hash_password(password)
@@ -371,103 +308,122 @@ def register_user(users_collection, email, password):
         "last_login": datetime.now()
     }
     
-    users_collection.insert_one(user_data)
+    user_repo.insert(user_data)
     return True, "Registration successful"
 
-def login_user(users_collection, email, password):
+def login_user(user_repo, email, password):
     """Login user"""
     hashed_password = hash_password(password)
-    user = users_collection.find_one({"email": email})
+    user = user_repo.find_by_email(email)
     
     if not user or user["password"] != hashed_password:
         return False, "Invalid email or password"
     
-    users_collection.update_one(
-        {"email": email},
-        {"$set": {"last_login": datetime.now()}}
-    )
+    user_repo.record_login(email, datetime.now())
     
     return True, "Login successful"
 
 # Dream analysis functions
-def extract_keywords(conversation, mistral_client):
-    """Extract keywords from conversation"""
-    try:
-        system_prompt = """
-        Extract 5-10 key thematic words or phrases from this dream analysis conversation.
-        Focus on important symbols, emotions, and interpretations.
-        Return ONLY a JSON object with a "keywords" field containing an array of strings.
-        Example: {"keywords": ["flying", "falling", "childhood home", "water", "transformation"]}
-        """
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": conversation}
-        ]
-        
-        response = mistral_client.chat.complete(
-            model="mistral-large-latest",
-            messages=messages,
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
-        
-        response_text = response.choices[0].message.content
-        keywords = json.loads(response_text).get("keywords", [])
-        return keywords if keywords else ["dream", "analysis"]
-    except Exception:
-        return ["dream", "analysis"]
-
-def analyze_dream_mood(dream_text, mistral_client):
-    """Analyze the mood/emotional tone of a dream"""
-    try:
-        system_prompt = """
-        Analyze the emotional tone and mood of this dream. 
-        Return ONLY a JSON object with "mood" (positive/neutral/negative/mysterious) and "emotions" (array of 2-3 key emotions).
-        Example: {"mood": "mysterious", "emotions": ["curiosity", "anxiety", "wonder"]}
-        """
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": dream_text}
-        ]
-        
-        response = mistral_client.chat.complete(
-            model="mistral-large-latest",
-            messages=messages,
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
-        
-        response_text = response.choices[0].message.content
-        mood_data = json.loads(response_text)
-        return mood_data.get("mood", "neutral"), mood_data.get("emotions", ["calm"])
-    except Exception:
-        return "neutral", ["calm"]
+def extract_keywords(conversation, llm_client):
+    """Extract keywords from conversation; raises if the model call fails"""
+    system_prompt = """
+    Extract 5-10 key thematic words or phrases from this dream or dream analysis conversation.
+    Focus on important symbols, emotions, and interpretations.
+    Return ONLY a JSON object with a "keywords" field containing an array of strings.
+    Example: {"keywords": ["flying", "falling", "childhood home", "water", "transformation"]}
+    """
+    
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": conversation}
+    ]
+    
+    response_text = cached_chat_complete(
+        llm_client,
+        "keywords",
+        messages,
+        temperature=0.1,
+        response_format={"type": "json_object"}
+    )
+    return json.loads(response_text).get("keywords") or []
 
-def analyze_dream(dream_text, mistral_client, user_email=None, previous_dreams=None):
-    """Analyze dream using Mistral AI with crisis detection"""
-    # Crisis detection - check if dream contains concerning content
-    crisis_keywords = [
-        "suicid", "kill myself", "end my life", "don't want to live", 
-        "self-harm", "cut myself", "hurt myself", "die", "death",
-        "hopeless", "no reason to live", "no point", "can't go on",
-        "give up", "too much pain", "better off without me"
+def analyze_dream_mood(dream_text, llm_client):
+    """Analyze the mood/emotional tone of a dream; raises if the model call fails"""
+    system_prompt = """
+    Analyze the emotional tone and mood of this dream. 
+    Return ONLY a JSON object with "mood" (positive/neutral/negative/mysterious) and "emotions" (array of 2-3 key emotions).
+    Example: {"mood": "mysterious", "emotions": ["curiosity", "anxiety", "wonder"]}
+    """
+    
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": dream_text}
     ]
     
-    mental_health_resources = {
-        "india": "Tele-MANAS: 14416 (24/7), Parivarthan: +91-7676602602",
-        "united states": "988 Suicide & Crisis Lifeline, Crisis Text Line: Text HOME to 741741",
-        "uk": "Samaritans: 116 123, Shout: Text 85258",
-        "united kingdom": "Samaritans: 116 123, Shout: Text 85258",
-        "australia": "Lifeline: 13 11 14, Beyond Blue: 1300 22 4636",
-        "canada": "Crisis Services Canada: 1-833-456-4566"
+    response_text = cached_chat_complete(
+        llm_client,
+        "mood",
+        messages,
+        temperature=0.1,
+        response_format={"type": "json_object"}
+    )
+    mood_data = json.loads(response_text)
+    return mood_data.get("mood") or None, mood_data.get("emotions") or []
+
+# "combined" fetches mood, emotions and keywords in one call, "split" uses one call each
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "combined").lower()
+
+def validate_structured_analysis(data):
+    """Validate and normalize a structured analysis response; missing or invalid fields come back empty"""
+    if not isinstance(data, dict):
+        raise ValueError("Structured analysis must be a JSON object")
+    
+    mood = str(data.get("mood", "")).strip().lower()
+    if mood not in MOOD_OPTIONS:
+        mood = None
+    
+    emotions = data.get("emotions") if isinstance(data.get("emotions"), list) else []
+    keywords = data.get("keywords") if isinstance(data.get("keywords"), list) else []
+    emotions = [str(e).strip() for e in emotions if str(e).strip()]
+    keywords = [str(k).strip() for k in keywords if str(k).strip()]
+    summary = data.get("summary")
+    
+    return {
+        "mood": mood,
+        "emotions": emotions[:3],
+        "keywords": keywords[:10],
+        "summary": str(summary).strip() if summary else None
     }
+
+def analyze_dream_structure(dream_text, llm_client):
+    """Get mood, emotions, keywords and a short summary in a single call; raises if the model call fails"""
+    system_prompt = """
+    Analyze this dream and return ONLY a JSON object with these fields:
+    - "mood": one of positive/neutral/negative/mysterious
+    - "emotions": array of 2-3 key emotions
+    - "keywords": array of 5-10 key thematic words or phrases (important symbols, emotions, themes)
+    - "summary": one short sentence summarizing the dream
+    Example: {"mood": "mysterious", "emotions": ["curiosity", "anxiety"], "keywords": ["flying", "childhood home", "water", "transformation", "falling"], "summary": "A flight over a childhood home that ends in a fall."}
+    """
     
-    global_resource = "International Association for Suicide Prevention (IASP): https://findahelpline.com"
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": dream_text}
+    ]
     
-    # Check for crisis keywords in the dream text
-    crisis_detected = any(keyword in dream_text.lower() for keyword in crisis_keywords)
+    response_text = cached_chat_complete(
+        llm_client,
+        "structured",
+        messages,
+        temperature=0.1,
+        response_format={"type": "json_object"}
+    )
+    return validate_structured_analysis(json.loads(response_text))
+
+def dream_crisis_response(dream_text):
+    """Return the crisis response if the dream contains concerning content, else None"""
+    # Crisis detection - check if dream contains concerning content
+    crisis_detected = detect_crisis(dream_text)
     
     # If crisis is detected, prioritize crisis response over dream analysis
     if crisis_detected:
@@ -484,7 +440,10 @@ def analyze_dream(dream_text, mistral_client, user_email=None, previous_dreams=N
         """
         return crisis_response
     
-    # If no crisis detected, proceed with normal dream analysis
+    return None
+
+def build_dream_analysis_messages(dream_text, previous_dreams=None):
+    """Build the chat messages for a dream analysis"""
     system_prompt = """
     You are a professional dream analyst with expertise in psychology, symbolism, and interpretation.
     
@@ -511,145 +470,294 @@ def analyze_dream(dream_text, mistral_client, user_email=None, previous_dreams=N
         {"role": "user", "content": f"Here is my dream: {dream_text}"}
     ]
     
+    return messages
+
+def analyze_dream(dream_text, llm_client, user_email=None, previous_dreams=None):
+    """Analyze dream using Mistral AI with crisis detection"""
+    # If crisis is detected, prioritize crisis response over dream analysis
+    crisis_response = dream_crisis_response(dream_text)
+    if crisis_response:
+        return crisis_response
+    
+    messages = build_dream_analysis_messages(dream_text, previous_dreams)
+    return cached_chat_complete(llm_client, "analysis", messages, temperature=0.7)
+
+def analyze_dream_stream(dream_text, llm_client, user_email=None, previous_dreams=None):
+    """Stream a dream analysis chunk by chunk, with the same crisis detection as analyze_dream"""
+    crisis_response = dream_crisis_response(dream_text)
+    if crisis_response:
+        yield crisis_response
+        return
+    
+    messages = build_dream_analysis_messages(dream_text, previous_dreams)
+    yield from stream_chat_completion(llm_client, "analysis", messages, temperature=0.7)
+
+ANALYSIS_UNAVAILABLE_MESSAGE = "I apologize, but I'm having trouble analyzing your dream right now. Please try again in a few minutes."
+
+def future_result(future, fallback, field, fallback_fields):
+    """Return a future's result, or the fallback value with the field flagged if the call failed"""
     try:
-        response = mistral_client.chat.complete(
-            model="mistral-large-latest",
-            messages=messages,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
+        return future.result()
+    except Exception:
+        fallback_fields.append(field)
+        return fallback
+
+def run_analysis_pipeline(dream_text, llm_client, user_email=None, previous_dreams=None, include_keywords=True, analysis_stream_handler=None):
+    """Run the analysis, mood and keyword calls concurrently
+
+    Keywords are extracted from the dream text alone so they don't have to
+    wait for the analysis; the total wait is that of the slowest call.
+    In "combined" mode mood, emotions and keywords come from one call.
+    If analysis_stream_handler is given, the analysis is streamed through it
+    on the calling thread while the other calls run in the pool.
+    Fields a call failed to return, or returned empty, are left empty
+    (the analysis gets a placeholder message) and listed in
+    result["fallback_fields"] so they are saved as pending.
+    """
+    executor = get_llm_executor()
+    fallback_fields = []
+    
+    structured_future = mood_future = keywords_future = None
+    if ANALYSIS_MODE == "combined":
+        structured_future = executor.submit(analyze_dream_structure, dream_text, llm_client)
+    else:
+        mood_future = executor.submit(analyze_dream_mood, dream_text, llm_client)
+        if include_keywords:
+            keywords_future = executor.submit(extract_keywords, f"Dream: {dream_text}", llm_client)
+    
+    if analysis_stream_handler:
+        def guarded_chunks(chunks):
+            try:
+                yield from chunks
+            except Exception:
+                fallback_fields.append("analysis")
+                yield ANALYSIS_UNAVAILABLE_MESSAGE
         
-    except Exception as e:
-        return f"I apologize, but I'm having trouble analyzing your dream right now. Error: {str(e)}"
+        analysis = analysis_stream_handler(guarded_chunks(analyze_dream_stream(dream_text, llm_client, user_email, previous_dreams)))
+    else:
+        analysis_future = executor.submit(analyze_dream, dream_text, llm_client, user_email, previous_dreams)
+        analysis = future_result(analysis_future, ANALYSIS_UNAVAILABLE_MESSAGE, "analysis", fallback_fields)
+    
+    if structured_future:
+        try:
+            result = structured_future.result()
+        except Exception:
+            result = validate_structured_analysis({})
+        if not include_keywords:
+            result["keywords"] = []
+    else:
+        try:
+            mood, emotions = mood_future.result()
+        except Exception:
+            mood, emotions = None, []
+        keywords = []
+        if keywords_future:
+            try:
+                keywords = keywords_future.result()
+            except Exception:
+                pass
+        result = {
+            "mood": mood,
+            "emotions": emotions,
+            "keywords": keywords,
+            "summary": None
+        }
+    
+    # Empty fields are saved as pending rather than filled in with a guess
+    requested = ["mood", "emotions", "keywords"] if include_keywords else ["mood", "emotions"]
+    fallback_fields.extend(field for field in requested if not result[field])
+    
+    result["analysis"] = analysis
+    result["fallback_fields"] = fallback_fields
+    return result
+
+ANALYST_LABELS = {"user": "User", "analyst": "Dream Analyst"}
+THERAPIST_LABELS = {"user": "User", "therapist": "Therapist"}
+
+def new_conversation_memory():
+    """Create a conversation memory using the configured token budget"""
+    return ConversationMemory(
+        token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "1500")),
+        recent_turns=int(os.getenv("MEMORY_RECENT_TURNS", "6"))
+    )
+
+def summarize_turns(llm_client, previous_summary, turns, labels):
+    """Fold new conversation turns into the running summary"""
+    new_turns = "\n\n".join(f"{labels.get(msg['role'], msg['role'].title())}: {msg['content']}" for msg in turns)
+    messages = [
+        {"role": "system", "content": """
+        You maintain a running summary of a supportive conversation.
+        Update the existing summary with the new turns. Keep the important feelings, symbols,
+        personal details (such as the user's country) and open questions. Stay under 150 words.
+        Return only the updated summary.
+        """},
+        {"role": "user", "content": f"Existing summary: {previous_summary or 'None'}\n\nNew turns:\n{new_turns}"}
+    ]
+    
+    try:
+        return cached_chat_complete(llm_client, "summary", messages, temperature=0.3)
+    except Exception:
+        # Keep the gist rather than dropping the turns entirely
+        return f"{previous_summary}\n{new_turns}".strip()[-2000:]
+
+def build_conversation_context(conversation_history, labels, llm_client=None, memory=None):
+    """Format the conversation for a prompt, summarizing older turns when a memory is given"""
+    summary, recent = "", conversation_history
+    if memory is not None:
+        summary, recent = memory.update(
+            conversation_history,
+            lambda previous_summary, turns: summarize_turns(llm_client, previous_summary, turns, labels)
+        )
+    
+    conversation_context = f"Summary of earlier conversation: {summary}\n\n" if summary else ""
+    for msg in recent:
+        role = labels.get(msg["role"], msg["role"].title())
+        conversation_context += f"{role}: {msg['content']}\n\n"
+    return conversation_context
+
+FOLLOWUP_SYSTEM_PROMPT = """Continue the dream analysis conversation naturally. 
+                    Be supportive and insightful. Ask only one question per response."""
+
+def build_followup_messages(dream_text, conversation_history, user_response, system_prompt=FOLLOWUP_SYSTEM_PROMPT, llm_client=None, memory=None):
+    """Build the chat messages for a follow-up question about a dream"""
+    conversation_context = f"Dream: {dream_text}\n\n"
+    conversation_context += build_conversation_context(conversation_history, ANALYST_LABELS, llm_client, memory)
+    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"{conversation_context}User's latest message: {user_response}"}
+    ]
+
+def continue_dream_conversation(dream_text, conversation_history, user_response, llm_client, system_prompt=FOLLOWUP_SYSTEM_PROMPT, memory=None):
+    """Get the analyst's reply to a follow-up message"""
+    messages = build_followup_messages(dream_text, conversation_history, user_response, system_prompt, llm_client, memory)
+    return cached_chat_complete(llm_client, "followup", messages, temperature=0.7)
+
+def continue_dream_conversation_stream(dream_text, conversation_history, user_response, llm_client, system_prompt=FOLLOWUP_SYSTEM_PROMPT, memory=None):
+    """Stream the analyst's reply to a follow-up message"""
+    messages = build_followup_messages(dream_text, conversation_history, user_response, system_prompt, llm_client, memory)
+    yield from stream_chat_completion(llm_client, "followup", messages, temperature=0.7)
+
+def save_dream(dream_repo, user_email, dream_text, analysis, keywords, mood=None, emotions=None, summary=None, fallback_fields=None, dream_id=None):
+    """Save dream to database
 
-def save_dream(dreams_collection, user_email, dream_text, analysis, conversation, keywords, mood=None, emotions=None):
-    """Save dream to database"""
+    Fields listed in fallback_fields hold placeholders from a failed model
+    call; they are stored empty and recorded as pending instead.
+    """
+    fallback_fields = fallback_fields or []
     dream_data = {
         "user_email": user_email,
         "dream_text": dream_text,
-        "analysis": analysis,
-        "conversation": conversation,
-        "keywords": keywords,
-        "mood": mood or "neutral",
-        "emotions": emotions or [],
+        "analysis": None if "analysis" in fallback_fields else analysis,
+        "keywords": [] if "keywords" in fallback_fields else keywords,
+        "mood": None if "mood" in fallback_fields else mood,
+        "emotions": [] if "emotions" in fallback_fields else emotions or [],
         "date": datetime.now()
     }
-    
-    result = dreams_collection.insert_one(dream_data)
-    return result.inserted_id
+    if summary:
+        dream_data["summary"] = summary
+    if fallback_fields:
+        dream_data["pending_fields"] = fallback_fields
+    if dream_id is not None:
+        dream_data["_id"] = dream_id
+    
+    inserted_id = dream_repo.insert(dream_data)
+    dream_repo.record_stats(
+        user_email,
+        date=dream_data["date"],
+        keywords=dream_data["keywords"],
+        mood=dream_data["mood"],
+        emotions=dream_data["emotions"]
+    )
+    return inserted_id
 
-def get_user_previous_dreams(dreams_collection, user_email, limit=5):
-    """Get user's previous dreams"""
-    cursor = dreams_collection.find(
-        {"user_email": user_email}
-    ).sort("date", pymongo.DESCENDING).limit(limit)
+def persist_dream_job(dream_repo, llm_client, dream_id, user_email, dream_text, result):
+    """Background job: save a dream, then fill in its keywords if the analysis didn't include them"""
+    needs_keywords = not result["keywords"] and "keywords" not in result["fallback_fields"]
+    fallback_fields = result["fallback_fields"] + (["keywords"] if needs_keywords else [])
+    
+    save_dream(
+        dream_repo,
+        user_email,
+        dream_text,
+        result["analysis"],
+        result["keywords"],
+        result["mood"],
+        result["emotions"],
+        result.get("summary"),
+        fallback_fields,
+        dream_id=dream_id
+    )
     
-    return list(cursor)
+    if needs_keywords:
+        try:
+            keywords = extract_keywords(f"Dream: {dream_text}", llm_client)
+        except Exception:
+            keywords = []
+        if not keywords:
+            # The dream stays saved with keywords marked as pending
+            return {"dream_id": str(dream_id), "keywords": None}
+        dream_repo.set_keywords(user_email, dream_id, keywords)
+        dream_repo.record_stats(user_email, keywords=keywords)
+        return {"dream_id": str(dream_id), "keywords": keywords}
+    
+    return {"dream_id": str(dream_id), "keywords": result["keywords"]}
 
-def search_user_dreams(dreams_collection, user_email, search_term=None, date_filter=None, mood_filter=None):
-    """Search user's dreams with filters"""
-    query = {"user_email": user_email}
-    
-    if search_term:
-        query["$or"] = [
-            {"dream_text": {"$regex": search_term, "$options": "i"}},
-            {"keywords": {"$regex": search_term, "$options": "i"}}
-        ]
-    
+def get_user_previous_dreams(dream_repo, user_email, limit=3):
+    """Get user's previous dreams, trimmed to what the analysis prompt quotes"""
+    return dream_repo.recent(user_email, limit, view="context")
+
+def search_words(search_term):
+    """The plain words of a search; quotes and leading '-' would mean phrases and negation to $text"""
+    return re.findall(r"\w+", search_term or "")
+
+# Dreams per Dream History page
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+
+def search_user_dreams(dream_repo, user_email, search_term=None, date_filter=None, mood_filter=None,
+                       view="listing", after=None, skip=0, limit=0):
+    """Search user's dreams with filters
+
+    With a search term, dreams are matched through the text index (stemmed,
+    case-insensitive) and ranked by relevance; otherwise newest first.
+    """
+    date_range = None
     if date_filter:
-        start_date = datetime.combine(date_filter, datetime.min.time())
-        end_date = datetime.combine(date_filter, datetime.max.time())
-        query["date"] = {"$gte": start_date, "$lte": end_date}
+        date_range = (
+            datetime.combine(date_filter, datetime.min.time()),
+            datetime.combine(date_filter, datetime.max.time())
+        )
     
-    if mood_filter and mood_filter != "All":
-        query["mood"] = mood_filter.lower()
+    mood = mood_filter.lower() if mood_filter and mood_filter != "All" else None
     
-    cursor = dreams_collection.find(query).sort("date", pymongo.DESCENDING)
-    return list(cursor)
+    return dream_repo.search(
+        user_email, search_words(search_term), date_range, mood,
+        view=view, after=after, skip=skip, limit=limit, batch_size=limit or None
+    )
 
-def get_dream_statistics(dreams_collection, user_email):
+def get_dream_statistics(dream_repo, user_email):
     """Get user's dream statistics"""
     try:
-        dreams = list(dreams_collection.find({"user_email": user_email}))
-        
-        if not dreams:
-            return None
-        
-        total_dreams = len(dreams)
-        
-        # Most recent dream
-        most_recent = max(dreams, key=lambda x: x['date'])
-        days_since_last = (datetime.now() - most_recent['date']).days
-        
-        # Keyword frequency
-        all_keywords = []
-        all_moods = []
-        all_emotions = []
-        
-        for dream in dreams:
-            all_keywords.extend(dream.get('keywords', []))
-            if dream.get('mood'):
-                all_moods.append(dream['mood'])
-            all_emotions.extend(dream.get('emotions', []))
-        
-        keyword_counts = Counter(all_keywords)
-        mood_counts = Counter(all_moods)
-        emotion_counts = Counter(all_emotions)
-        
-        # Dreams per month (last 6 months)
-        six_months_ago = datetime.now() - timedelta(days=180)
-        recent_dreams = [d for d in dreams if d['date'] > six_months_ago]
-        
-        monthly_counts = {}
-        for dream in recent_dreams:
-            month_key = dream['date'].strftime('%Y-%m')
-            monthly_counts[month_key] = monthly_counts.get(month_key, 0) + 1
-        
-        return {
-            'total_dreams': total_dreams,
-            'days_since_last': days_since_last,
-            'most_common_keywords': keyword_counts.most_common(5),
-            'mood_distribution': dict(mood_counts),
-            'most_common_emotions': emotion_counts.most_common(3),
-            'monthly_counts': monthly_counts
-        }
+        return summarize_stats(dream_repo.user_stats(user_email))
     except Exception:
         return None
 
-def create_download_link(content, filename, file_format="txt"):
-    """Create a download link for dream content with consistent styling"""
-    if file_format == "txt":
-        b64 = base64.b64encode(content.encode()).decode()
-        href = f'<a href="data:text/plain;base64,{b64}" download="{filename}" class="share-btn">&#128221; Download as Text</a>'
-    elif file_format == "json":
-        b64 = base64.b64encode(json.dumps(content, default=str, indent=2).encode()).decode()
-        href = f'<a href="data:application/json;base64,{b64}" download="{filename}" class="share-btn">&#128203; Download as JSON</a>'
-    
-    return href
+def get_analytics_figures(dream_repo, user_email, stats):
+    """Analytics figures, built once per user write version and chart data"""
+    chart_data = {field: stats.get(field) for field, _, _ in ANALYTICS_CHARTS}
+    return dream_repo.cache.get_or_load(
+        user_email, "analytics_figures", chart_data,
+        lambda: build_figures(stats), copy_value=False
+    )
 
-def therapist_chat(user_input, conversation_history, mistral_client, user_email):
-    """Handle therapist conversation with crisis detection"""
-    crisis_keywords = [
-        "suicid", "kill myself", "end my life", "don't want to live", 
-        "self-harm", "cut myself", "hurt myself", "die", "death",
-        "hopeless", "no reason to live", "no point", "can't go on",
-        "give up", "too much pain", "better off without me"
-    ]
-    
-    mental_health_resources = {
-        "india": "Tele-MANAS: 14416 (24/7), Parivarthan: +91-7676602602",
-        "united states": "988 Suicide & Crisis Lifeline, Crisis Text Line: Text HOME to 741741",
-        "uk": "Samaritans: 116 123, Shout: Text 85258",
-        "united kingdom": "Samaritans: 116 123, Shout: Text 85258",
-        "australia": "Lifeline: 13 11 14, Beyond Blue: 1300 22 4636",
-        "canada": "Crisis Services Canada: 1-833-456-4566"
-    }
-    
-    global_resource = "International Association for Suicide Prevention (IASP): https://findahelpline.com"
-    
+def build_therapist_request(user_input, conversation_history, llm_client=None, memory=None):
+    """Build the therapist prompt and the crisis state used to post-process its reply
+
+    Crisis and country detection always look at the full history; only the
+    prompt context is trimmed by the memory.
+    """
     # Check for crisis keywords
-    crisis_mode = any(keyword in user_input.lower() for keyword in crisis_keywords)
+    crisis_mode = detect_crisis(user_input)
     
     # Check if we already asked for country
     asked_for_country = any("which country are you in" in msg["content"].lower() or 
@@ -660,10 +768,7 @@ def therapist_chat(user_input, conversation_history, mistral_client, user_email)
     user_country = None
     for msg in conversation_history:
         if msg["role"] == "user":
-            for country in mental_health_resources.keys():
-                if country in msg["content"].lower():
-                    user_country = country
-                    break
+            user_country = find_country(msg["content"])
             if user_country:
                 break
     
@@ -695,61 +800,236 @@ def therapist_chat(user_input, conversation_history, mistral_client, user_email)
         5. Remind them that they're not alone and help is available
         
         Available resources:
-        {json.dumps(mental_health_resources, indent=2)}
-        Global resource: {global_resource}
+        {json.dumps(MENTAL_HEALTH_RESOURCES, indent=2)}
+        Global resource: {GLOBAL_RESOURCE}
         
         This is your HIGHEST PRIORITY. Provide specific helpline numbers when possible.
         """
     
     # Build conversation context
-    conversation_context = ""
-    for msg in conversation_history:
-        role = "User" if msg["role"] == "user" else "Therapist"
-        conversation_context += f"{role}: {msg['content']}\n\n"
+    conversation_context = build_conversation_context(conversation_history, THERAPIST_LABELS, llm_client, memory)
     
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Previous conversation: {conversation_context}\nUser's latest message: {user_input}"}
     ]
     
-    try:
-        response = mistral_client.chat.complete(
-            model="mistral-large-latest",
-            messages=messages,
-            temperature=0.7
-        )
-        
-        therapist_response = response.choices[0].message.content
+    return {
+        "messages": messages,
+        "crisis_mode": crisis_mode,
+        "user_country": user_country,
+        "asked_for_country": asked_for_country,
+        "mental_health_resources": MENTAL_HEALTH_RESOURCES,
+        "global_resource": GLOBAL_RESOURCE
+    }
+
+def therapist_response_suffix(therapist_response, request):
+    """Return crisis text to append when the therapist reply left it out"""
+    mental_health_resources = request["mental_health_resources"]
+    user_country = request["user_country"]
+    
+    # If in crisis mode and we know the country but therapist didn't include resources,
+    # manually append the appropriate resources
+    if request["crisis_mode"] and user_country and user_country in mental_health_resources:
+        if mental_health_resources[user_country].lower() not in therapist_response.lower():
+            return f"\n\nPlease reach out to these resources immediately: {mental_health_resources[user_country]}"
+    
+    # If in crisis mode but no country known and therapist didn't ask for it,
+    # manually prompt for country
+    elif request["crisis_mode"] and not user_country and not request["asked_for_country"]:
+        if "country" not in therapist_response.lower() and "where are you" not in therapist_response.lower():
+            return "\n\nI'm concerned about you. Could you tell me which country you're in so I can provide the most relevant resources?"
+    
+    return ""
+
+def therapist_fallback_response(request):
+    """Fallback response when the model is unavailable, including crisis resources"""
+    mental_health_resources = request["mental_health_resources"]
+    user_country = request["user_country"]
+    
+    if request["crisis_mode"]:
+        crisis_response = "I'm really concerned about what you're sharing. It sounds like you're going through an incredibly difficult time."
         
-        # If in crisis mode and we know the country but therapist didn't include resources,
-        # manually append the appropriate resources
-        if crisis_mode and user_country and user_country in mental_health_resources:
-            if mental_health_resources[user_country].lower() not in therapist_response.lower():
-                therapist_response += f"\n\nPlease reach out to these resources immediately: {mental_health_resources[user_country]}"
+        if user_country and user_country in mental_health_resources:
+            crisis_response += f" Please reach out to these resources immediately: {mental_health_resources[user_country]}"
+        elif not request["asked_for_country"]:
+            crisis_response += " Could you tell me which country you're in so I can provide the most relevant resources?"
+        else:
+            crisis_response += f" Here are some global resources: {request['global_resource']}"
+            
+        return crisis_response
+    return "I appreciate you sharing that with me. Could you tell me more about how you're feeling about this situation?"
+
+def therapist_chat(user_input, conversation_history, llm_client, user_email, memory=None):
+    """Handle therapist conversation with crisis detection"""
+    request = build_therapist_request(user_input, conversation_history, llm_client, memory)
+    
+    try:
+        therapist_response = cached_chat_complete(llm_client, "therapist", request["messages"], temperature=0.7)
+        return therapist_response + therapist_response_suffix(therapist_response, request)
         
-        # If in crisis mode but no country known and therapist didn't ask for it,
-        # manually prompt for country
-        elif crisis_mode and not user_country and not asked_for_country:
-            if "country" not in therapist_response.lower() and "where are you" not in therapist_response.lower():
-                therapist_response += "\n\nI'm concerned about you. Could you tell me which country you're in so I can provide the most relevant resources?"
+    except Exception:
+        return therapist_fallback_response(request)
+
+def therapist_chat_stream(user_input, conversation_history, llm_client, user_email, memory=None):
+    """Stream the therapist reply, appending crisis resources once it is complete"""
+    request = build_therapist_request(user_input, conversation_history, llm_client, memory)
+    
+    therapist_response = ""
+    try:
+        for chunk in stream_chat_completion(llm_client, "therapist", request["messages"], temperature=0.7):
+            therapist_response += chunk
+            yield chunk
+    except Exception:
+        if not therapist_response:
+            yield therapist_fallback_response(request)
+            return
+    
+    yield therapist_response_suffix(therapist_response, request)
+# Page functions
+def render_stream(chunks, role="analyst"):
+    """Render streamed chunks into a chat bubble as they arrive and return the full text"""
+    placeholder = st.empty()
+    text = ""
+    last_render = 0.0
+    
+    for chunk in chunks:
+        text += chunk
+        # Throttle redraws so long replies don't send one delta per token
+        if time.monotonic() - last_render > 0.05:
+            placeholder.markdown(chat_message(role, text + "&#9612;"), unsafe_allow_html=True)
+            last_render = time.monotonic()
+    
+    placeholder.markdown(chat_message(role, text), unsafe_allow_html=True)
+    return text
+
+def show_analysis_result(dream_text, llm_client, user_email=None, previous_dreams=None, include_keywords=True):
+    """Run the analysis pipeline and display the mood and analysis, streaming when enabled"""
+    if STREAM_RESPONSES:
+        st.markdown("### &#128302; Dream Analysis")
+        mood_container = st.container()
+        result = run_analysis_pipeline(
+            dream_text, llm_client, user_email, previous_dreams, include_keywords,
+            analysis_stream_handler=lambda chunks: render_stream(chunks)
+        )
+    else:
+        with st.spinner("&#10024; Analyzing your dream..."):
+            result = run_analysis_pipeline(dream_text, llm_client, user_email, previous_dreams, include_keywords)
+        st.markdown("### &#128302; Dream Analysis")
+        mood_container = st.container()
+        st.markdown(chat_message("analyst", result["analysis"]), unsafe_allow_html=True)
+    
+    with mood_container:
+        if result["mood"]:
+            st.markdown(MOOD_BADGE.format(mood=result["mood"], label=f'Mood: {result["mood"].title()}'), unsafe_allow_html=True)
+        for emotion in result["emotions"][:3]:
+            st.markdown(MOOD_BADGE.format(mood="neutral", label=emotion), unsafe_allow_html=True)
+    
+    return result
+
+def show_background_jobs():
+    """Show the status of this session's background save jobs
+
+    A finished save sets saved_since_full_run so the analyze panel can rerun
+    the whole page and refresh the stats cards; its message is kept in
+    save_notices to be shown again after that rerun.
+    """
+    job_queue = get_job_queue()
+    remaining = []
+    notices = []
+    
+    for notice in st.session_state.pop("save_notices", []):
+        st.success(notice)
+    
+    for job_id in st.session_state.get("background_jobs", []):
+        job = job_queue.status(job_id)
+        if job is None:
+            continue
+        if job["status"] == "done":
+            notices.append(f"&#9989; Dream saved successfully! (ID: {job['result']['dream_id']})")
+            st.success(notices[-1])
+            st.session_state.saved_since_full_run = True
+        elif job["status"] == "failed":
+            st.error(f"We couldn't save your dream: {job['error']}")
+        else:
+            st.caption("&#9203; Saving your dream in the background...")
+            remaining.append(job_id)
+    
+    st.session_state.background_jobs = remaining
+    if notices:
+        st.session_state.save_notices = notices
+
+@st.cache_resource
+def get_export_cache():
+    """Built download files shared across sessions"""
+    return ExportCache(max_bytes=int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+
+def show_download_buttons(record, file_stem, version, formats=("txt", "json", "md"), title="Dream Analysis Report", lazy=True):
+    """Offer a record for download in each format
+
+    With lazy set, a file is only built once the user picks its format, and
+    until then the page carries nothing but the buttons. Results that only
+    exist during the run that produced them can't wait for another click,
+    so lazy=False builds the files straight away.
+    """
+    cache = get_export_cache()
+    chosen_key = f"download_{file_stem}"
+    
+    for col, fmt in zip(st.columns(len(formats)), formats):
+        with col:
+            if lazy and st.session_state.get(chosen_key) != fmt:
+                if not st.button(f"Prepare {DOWNLOAD_FORMATS[fmt]['label']}", key=f"{chosen_key}_{fmt}"):
+                    continue
+                # Swap the button for the file in this same run; no rerun needed
+                st.session_state[chosen_key] = fmt
+            
+            st.download_button(
+                f"Download {DOWNLOAD_FORMATS[fmt]['label']}",
+                cache.get_or_build((version, fmt), lambda: serialize(record, fmt, title)),
+                file_name=f"{file_stem}.{fmt}",
+                mime=DOWNLOAD_FORMATS[fmt]["mime"],
+                key=f"{chosen_key}_{fmt}_file",
+                on_click="ignore"
+            )
+
+# Dreams per insert_many call when importing a journal
+JOURNAL_IMPORT_CHUNK_SIZE = int(os.getenv("JOURNAL_IMPORT_CHUNK_SIZE", "500"))
+
+def show_journal_transfer(dream_repo, user_email):
+    """Export the whole journal or import one, as NDJSON or CSV"""
+    with st.expander("&#128230; Export or import your whole journal"):
+        fmt = st.radio("Format:", list(FORMATS), format_func=str.upper, horizontal=True, key="journal_format")
         
-        return therapist_response
+        if st.button("Prepare export", key="prepare_export"):
+            # Dreams come from a batched cursor, but download_button takes the finished
+            # file as bytes, so the encoded export is held in memory until it is served
+            export_file = BytesIO()
+            count = write_export(dream_repo.export(user_email), fmt, export_file)
+            st.download_button(
+                f"Download {count} dreams",
+                export_file.getvalue(),
+                file_name=f"dream_journal_{datetime.now().strftime('%Y%m%d')}.{FORMATS[fmt]['extension']}",
+                mime=FORMATS[fmt]["mime"],
+                on_click="ignore"
+            )
         
-    except Exception as e:
-        # Fallback response that includes crisis resources
-        if crisis_mode:
-            crisis_response = "I'm really concerned about what you're sharing. It sounds like you're going through an incredibly difficult time."
-            
-            if user_country and user_country in mental_health_resources:
-                crisis_response += f" Please reach out to these resources immediately: {mental_health_resources[user_country]}"
-            elif not asked_for_country:
-                crisis_response += " Could you tell me which country you're in so I can provide the most relevant resources?"
-            else:
-                crisis_response += f" Here are some global resources: {global_resource}"
-                
-            return crisis_response
-        return "I appreciate you sharing that with me. Could you tell me more about how you're feeling about this situation?"
-# Page functions
+        uploaded = st.file_uploader("Import dreams from a journal export:", type=["ndjson", "jsonl", "csv"], key="journal_upload")
+        if uploaded is not None and st.button("Import", key="run_import"):
+            import_format = "csv" if uploaded.name.lower().endswith(".csv") else "ndjson"
+            status = st.empty()
+            counts = import_dreams(
+                dream_repo,
+                user_email,
+                TextIOWrapper(uploaded, encoding="utf-8", newline=""),
+                import_format,
+                chunk_size=JOURNAL_IMPORT_CHUNK_SIZE,
+                progress=lambda counts: status.caption(f"&#9203; {counts['imported']} imported, {counts['duplicates']} already in your journal...")
+            )
+            status.success(
+                f"&#9989; Imported {counts['imported']} dreams. "
+                f"Skipped {counts['duplicates']} already in your journal and {counts['invalid']} invalid rows."
+            )
+
 def show_homepage():
     """Display homepage with quote and buttons"""
     load_css()
@@ -789,7 +1069,7 @@ def show_auth_page():
     """Display authentication page"""
     load_css()
     
-    _, users_collection, dreams_collection, mistral_client = initialize_clients()
+    _, user_repo, dream_repo, llm_client = initialize_clients()
     
     st.markdown('<h1 class="dream-title">&#128274; Account Access</h1>', unsafe_allow_html=True)
     
@@ -809,12 +1089,12 @@ def show_auth_page():
             submit = st.form_submit_button("Sign In", use_container_width=True)
             
             if submit:
-                if users_collection is None:
+                if user_repo is None:
                     st.error("Database connection failed. Please try again later.")
                     return
                 
                 if email and password:
-                    success, message = login_user(users_collection, email, password)
+                    success, message = login_user(user_repo, email, password)
                     if success:
                         st.session_state.user_email = email
                         st.session_state.page = "dashboard"
@@ -839,7 +1119,7 @@ def show_auth_page():
             submit = st.form_submit_button("Register", use_container_width=True)
             
             if submit:
-                if users_collection is None:
+                if user_repo is None:
                     st.error("Database connection failed. Please try again later.")
                     return
                 
@@ -853,7 +1133,7 @@ def show_auth_page():
                         if not valid:
                             st.error(message)
                         else:
-                            success, message = register_user(users_collection, email, password)
+                            success, message = register_user(user_repo, email, password)
                             if success:
                                 st.session_state.user_email = email
                                 st.session_state.page = "dashboard"
@@ -879,7 +1159,8 @@ def show_free_analysis():
     """Display free dream analysis page"""
     load_css()
     
-    _, users_collection, dreams_collection, mistral_client = initialize_clients()
+    # Free analysis never touches the database
+    _, user_repo, dream_repo, llm_client = initialize_clients(db_wait=0)
     
     st.markdown('<h1 class="dream-title">Free Dream Analysis</h1>', unsafe_allow_html=True)
     
@@ -899,30 +1180,16 @@ def show_free_analysis():
     
     if st.button("&#128302; Analyze My Dream", use_container_width=True):
         if dream_text.strip():
-            if mistral_client is None:
+            if llm_client is None:
                 st.error("AI service is currently unavailable. Please try again later.")
                 return
             
-            with st.spinner("&#10024; Analyzing your dream..."):
-                analysis = analyze_dream(dream_text, mistral_client)
-                mood, emotions = analyze_dream_mood(dream_text, mistral_client)
-            
-            st.markdown("### &#128302; Dream Analysis")
-            st.markdown(f'<div class="mood-indicator mood-{mood}">Mood: {mood.title()}</div>', unsafe_allow_html=True)
-            for emotion in emotions[:3]:
-                st.markdown(f'<div class="mood-indicator mood-neutral">{emotion}</div>', unsafe_allow_html=True)
-            
-            st.markdown(f'<div class="chat-message analyst-message"><strong>&#128302; Dream Analyst:</strong> {analysis}</div>', unsafe_allow_html=True)
+            result = show_analysis_result(dream_text, llm_client, include_keywords=False)
+            analysis = result["analysis"]
+            mood, emotions = result["mood"], result["emotions"]
             
             # Check for crisis keywords to show additional resources
-            crisis_keywords = [
-                "suicid", "kill myself", "end my life", "don't want to live", 
-                "self-harm", "cut myself", "hurt myself", "die", "death",
-                "hopeless", "no reason to live", "no point", "can't go on",
-                "give up", "too much pain", "better off without me"
-            ]
-            
-            crisis_detected = any(keyword in dream_text.lower() for keyword in crisis_keywords)
+            crisis_detected = detect_crisis(dream_text)
             
             if crisis_detected:
                 st.markdown("### &#128680; Mental Health Support")
@@ -946,16 +1213,15 @@ def show_free_analysis():
             
             with col1:
                 twitter_url = f"https://twitter.com/intent/tweet?text={share_text.replace(' ', '%20')}"
-                st.markdown(f'<a href="{twitter_url}" target="_blank" class="share-btn">&#128038; Twitter</a>', unsafe_allow_html=True)
+                st.markdown(SHARE_LINK.format(url=twitter_url, label="&#128038; Twitter"), unsafe_allow_html=True)
             
             with col2:
                 facebook_url = f"https://www.facebook.com/sharer/sharer.php?u=dreamanalyst.com"
-                st.markdown(f'<a href="{facebook_url}" target="_blank" class="share-btn">&#128084; Facebook</a>', unsafe_allow_html=True)
+                st.markdown(SHARE_LINK.format(url=facebook_url, label="&#128084; Facebook"), unsafe_allow_html=True)
             
             with col3:
-                download_content = f"Dream: {dream_text}\n\nAnalysis: {analysis}\n\nMood: {mood}\nEmotions: {', '.join(emotions)}"
-                download_link = create_download_link(download_content, "dream_analysis.txt")
-                st.markdown(download_link, unsafe_allow_html=True)
+                download_record = dream_record({"dream_text": dream_text, "analysis": analysis, "mood": mood, "emotions": emotions})
+                show_download_buttons(download_record, "dream_analysis", content_key(download_record), formats=("txt",), lazy=False)
             
             # Store in session for conversation
             st.session_state.current_dream = dream_text
@@ -963,6 +1229,7 @@ def show_free_analysis():
             st.session_state.conversation_history = [
                 {"role": "analyst", "content": analysis}
             ]
+            st.session_state.conversation_memory = new_conversation_memory()
             
             st.info("&#128161; Want to continue this conversation or save your dreams? Consider signing up for a free account!")
             
@@ -971,6 +1238,9 @@ def show_free_analysis():
     
     # Continue conversation if analysis exists
     if hasattr(st.session_state, 'current_analysis'):
+        if 'conversation_memory' not in st.session_state:
+            st.session_state.conversation_memory = new_conversation_memory()
+        
         st.markdown("### &#128172; Continue the Conversation")
         user_response = st.text_input("Ask a follow-up question or share more details...")
         
@@ -982,14 +1252,7 @@ def show_free_analysis():
                 })
                 
                 # Check for crisis keywords in user response
-                crisis_keywords = [
-                    "suicid", "kill myself", "end my life", "don't want to live", 
-                    "self-harm", "cut myself", "hurt myself", "die", "death",
-                    "hopeless", "no reason to live", "no point", "can't go on",
-                    "give up", "too much pain", "better off without me"
-                ]
-                
-                crisis_detected = any(keyword in user_response.lower() for keyword in crisis_keywords)
+                crisis_detected = detect_crisis(user_response)
                 
                 # If crisis is detected in the follow-up, prioritize crisis response
                 if crisis_detected:
@@ -1011,27 +1274,24 @@ def show_free_analysis():
                     st.rerun()
                 else:
                     # Normal conversation continuation
-                    conversation_context = f"Dream: {st.session_state.current_dream}\n\n"
-                    for msg in st.session_state.conversation_history:
-                        role = "Dream Analyst" if msg["role"] == "analyst" else "User"
-                        conversation_context += f"{role}: {msg['content']}\n\n"
-                    
-                    system_prompt = """Continue the dream analysis conversation naturally. 
-                    Be supportive and insightful. Ask only one question per response."""
-                    
-                    messages = [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"{conversation_context}User's latest message: {user_response}"}
-                    ]
-                    
                     try:
-                        response = mistral_client.chat.complete(
-                            model="mistral-large-latest",
-                            messages=messages,
-                            temperature=0.7
-                        )
+                        if STREAM_RESPONSES:
+                            ai_response = render_stream(continue_dream_conversation_stream(
+                                st.session_state.current_dream,
+                                st.session_state.conversation_history,
+                                user_response,
+                                llm_client,
+                                memory=st.session_state.conversation_memory
+                            ))
+                        else:
+                            ai_response = continue_dream_conversation(
+                                st.session_state.current_dream,
+                                st.session_state.conversation_history,
+                                user_response,
+                                llm_client,
+                                memory=st.session_state.conversation_memory
+                            )
                         
-                        ai_response = response.choices[0].message.content
                         st.session_state.conversation_history.append({
                             "role": "analyst",
                             "content": ai_response
@@ -1045,447 +1305,448 @@ def show_free_analysis():
         # Display conversation history
         for i, msg in enumerate(st.session_state.conversation_history):
             if msg["role"] == "user":
-                st.markdown(f'<div class="chat-message user-message"><strong>You:</strong> {msg["content"]}</div>', unsafe_allow_html=True)
+                st.markdown(chat_message("user", msg["content"]), unsafe_allow_html=True)
             else:
-                st.markdown(f'<div class="chat-message analyst-message"><strong>&#128302; Dream Analyst:</strong> {msg["content"]}</div>', unsafe_allow_html=True)
+                st.markdown(chat_message("analyst", msg["content"]), unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def show_dashboard():
-    """Display user dashboard"""
-    load_css()
-    
-    _, users_collection, dreams_collection, mistral_client = initialize_clients()
-    
-    st.markdown('<h1 class="dream-title">&#127775;&#10024; Your Dream Journey &#10024;&#127775;</h1>', unsafe_allow_html=True)
+@st.fragment
+def show_analyze_panel(dream_repo, llm_client):
+    """Analyze tab: new dreams and the follow-up conversation about the latest one"""
+    st.markdown('<div class="dream-card">', unsafe_allow_html=True)
+    st.subheader("Analyze Your Dream")
     
-    # User info and logout - FIXED: Email now uses user-email class
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.markdown(f'<div class="user-email">Welcome back, {st.session_state.user_email}!</div>', unsafe_allow_html=True)
-    with col2:
-        if st.button("Logout"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
-            st.session_state.page = "home"
-            st.rerun()
+    dream_text = st.text_area(
+        "Describe your dream in detail:",
+        placeholder="I had a dream where...",
+        height=150
+    )
     
-    # Get user statistics
-    stats = get_dream_statistics(dreams_collection, st.session_state.user_email)
+    show_background_jobs()
     
-    # Display statistics cards
-    if stats:
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f'''
-            <div class="stats-card">
-                <div class="stat-number">{stats['total_dreams']}</div>
-                <div class="stat-label">Total Dreams</div>
-            </div>
-            ''', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f'''
-            <div class="stats-card">
-                <div class="stat-number">{stats['days_since_last']}</div>
-                <div class="stat-label">Days Since Last</div>
-            </div>
-            ''', unsafe_allow_html=True)
-        
-        with col3:
-            most_common_keyword = stats['most_common_keywords'][0][0] if stats['most_common_keywords'] else "None"
-            st.markdown(f'''
-            <div class="stats-card">
-                <div class="stat-number">"{most_common_keyword}"</div>
-                <div class="stat-label">Top Symbol</div>
-            </div>
-            ''', unsafe_allow_html=True)
+    analyze_clicked = st.button("&#128302; Analyze Dream", use_container_width=True)
+    if analyze_clicked:
+        if dream_text.strip():
+            if llm_client is None:
+                st.error("AI service is currently unavailable.")
+                return
+            
+            # The database may still be connecting; analyze without past dreams then
+            previous_dreams = get_user_previous_dreams(dream_repo, st.session_state.user_email) if dream_repo is not None else []
+            
+            # In split mode keywords are extracted by the background job instead
+            result = show_analysis_result(
+                dream_text, llm_client, st.session_state.user_email, previous_dreams,
+                include_keywords=ANALYSIS_MODE == "combined"
+            )
+            analysis = result["analysis"]
+            mood, emotions = result["mood"], result["emotions"]
+            keywords = result["keywords"]
+            
+            # Save dream in the background so the page doesn't wait on keywords and the insert
+            conversation = f"Dream: {dream_text}\n\nAnalysis: {analysis}"
+            from bson import ObjectId
+            dream_id = ObjectId()
+            job_args = (dream_repo, llm_client, dream_id, st.session_state.user_email, dream_text, result)
+            
+            if dream_repo is None:
+                st.error("Unable to connect to dream database, so this dream wasn't saved.")
+            else:
+                try:
+                    job_id = get_job_queue().submit("save_dream", persist_dream_job, *job_args)
+                    if 'background_jobs' not in st.session_state:
+                        st.session_state.background_jobs = []
+                    st.session_state.background_jobs.append(job_id)
+                    st.info("&#128190; Saving your dream in the background...")
+                except JobQueueFull:
+                    persist_dream_job(*job_args)
+                    st.success(f"&#9989; Dream saved successfully! (ID: {dream_id})")
+                    st.session_state.saved_since_full_run = True
+            
+            if result["fallback_fields"]:
+                st.warning("Our AI service is having trouble right now, so part of this analysis is missing; it's saved as pending rather than filled in with a guess.")
+            
+            # Share options
+            st.markdown("### &#127775; Share & Export")
+            
+            share_text = f"Just analyzed my dream with Dream Analyst! {analysis[:100]}..."
+            twitter_url = f"https://twitter.com/intent/tweet?text={share_text.replace(' ', '%20')}"
+            st.markdown(SHARE_LINK.format(url=twitter_url, label="&#128038; Share on Twitter"), unsafe_allow_html=True)
+            
+            download_record = dream_record({
+                "dream_text": dream_text,
+                "analysis": analysis,
+                "mood": mood,
+                "emotions": emotions,
+                "keywords": keywords
+            })
+            show_download_buttons(download_record, f"dream_report_{dream_id}", str(dream_id), lazy=False)
+            
+            # Store for continued conversation
+            st.session_state.current_dream_session = {
+                "dream_text": dream_text,
+                "analysis": analysis,
+                "conversation": conversation,
+                "dream_id": dream_id
+            }
         
-        with col4:
-            most_common_mood = max(stats['mood_distribution'].items(), key=lambda x: x[1])[0] if stats['mood_distribution'] else "neutral"
-            st.markdown(f'''
-            <div class="stats-card">
-                <div class="stat-number">{most_common_mood.title()}</div>
-                <div class="stat-label">Common Mood</div>
-            </div>
-            ''', unsafe_allow_html=True)
+        else:
+            st.error("Please describe your dream.")
     
-    # Main dashboard tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["&#128302; Analyze Dream", "&#129489;&#8205;&#9877;&#65039; Talk to Therapist", "&#128216; Dream History", "&#128202; Analytics"])
+    show_dream_followup(llm_client)
     
-    with tab1:
-        st.markdown('<div class="dream-card">', unsafe_allow_html=True)
-        st.subheader("Analyze Your Dream")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # A save finished since the page last ran in full: rerun it so the stats cards and
+    # analytics include the dream, but not over a result that was just shown
+    if not analyze_clicked and st.session_state.pop("saved_since_full_run", False):
+        st.rerun()
+
+@st.fragment
+def show_dream_followup(llm_client):
+    """Follow-up conversation about the dream just analyzed; a message reruns only this panel"""
+    if hasattr(st.session_state, 'current_dream_session'):
+        st.markdown("### &#128172; Continue Conversation")
         
-        dream_text = st.text_area(
-            "Describe your dream in detail:",
-            placeholder="I had a dream where...",
-            height=150
-        )
+        if 'dream_conversation' not in st.session_state:
+            st.session_state.dream_conversation = [
+                {"role": "analyst", "content": st.session_state.current_dream_session['analysis']}
+            ]
+            st.session_state.dream_memory = new_conversation_memory()
         
-        if st.button("&#128302; Analyze Dream", use_container_width=True):
-            if dream_text.strip():
-                if mistral_client is None:
-                    st.error("AI service is currently unavailable.")
-                    return
-                
-                previous_dreams = get_user_previous_dreams(dreams_collection, st.session_state.user_email)
-                
-                with st.spinner("&#10024; Analyzing your dream..."):
-                    analysis = analyze_dream(dream_text, mistral_client, st.session_state.user_email, previous_dreams)
-                    mood, emotions = analyze_dream_mood(dream_text, mistral_client)
-                
-                st.markdown("### &#128302; Dream Analysis")
-                st.markdown(f'<div class="mood-indicator mood-{mood}">Mood: {mood.title()}</div>', unsafe_allow_html=True)
-                for emotion in emotions[:3]:
-                    st.markdown(f'<div class="mood-indicator mood-neutral">{emotion}</div>', unsafe_allow_html=True)
-                
-                st.markdown(f'<div class="chat-message analyst-message"><strong>&#128302; Dream Analyst:</strong> {analysis}</div>', unsafe_allow_html=True)
-                
-                # Save dream
-                conversation = f"Dream: {dream_text}\n\nAnalysis: {analysis}"
-                keywords = extract_keywords(conversation, mistral_client)
-                
-                dream_id = save_dream(
-                    dreams_collection,
-                    st.session_state.user_email,
-                    dream_text,
-                    analysis,
-                    conversation,
-                    keywords,
-                    mood,
-                    emotions
-                )
-                
-                st.success(f"&#9989; Dream saved successfully! (ID: {dream_id})")
+        user_response = st.text_input("Ask questions or share more details...", key="dream_followup")
+        
+        if st.button("Send Message", key="send_dream_msg"):
+            if user_response.strip():
+                st.session_state.dream_conversation.append({
+                    "role": "user",
+                    "content": user_response
+                })
                 
-                # Share options
-                st.markdown("### &#127775; Share & Export")
-                col1, col2, col3 = st.columns(3)
+                system_prompt = """Continue the dream analysis conversation naturally. 
+                Be supportive and insightful. Ask only one question per response.
+                Watch for any mental health concerns and provide appropriate resources if needed."""
                 
-                with col1:
-                    share_text = f"Just analyzed my dream with Dream Analyst! {analysis[:100]}..."
-                    twitter_url = f"https://twitter.com/intent/tweet?text={share_text.replace(' ', '%20')}"
-                    st.markdown(f'<a href="{twitter_url}" target="_blank" class="share-btn">&#128038; Share on Twitter</a>', unsafe_allow_html=True)
+                try:
+                    if STREAM_RESPONSES:
+                        ai_response = render_stream(continue_dream_conversation_stream(
+                            st.session_state.current_dream_session['dream_text'],
+                            st.session_state.dream_conversation,
+                            user_response,
+                            llm_client,
+                            system_prompt,
+                            st.session_state.dream_memory
+                        ))
+                    else:
+                        ai_response = continue_dream_conversation(
+                            st.session_state.current_dream_session['dream_text'],
+                            st.session_state.dream_conversation,
+                            user_response,
+                            llm_client,
+                            system_prompt,
+                            st.session_state.dream_memory
+                        )
+                    
+                    st.session_state.dream_conversation.append({
+                        "role": "analyst",
+                        "content": ai_response
+                    })
+                    
+                    st.rerun(scope="fragment")
                 
-                with col2:
-                    export_data = {
-                        "dream": dream_text,
-                        "analysis": analysis,
-                        "mood": mood,
-                        "emotions": emotions,
-                        "keywords": keywords,
-                        "date": datetime.now().isoformat()
-                    }
-                    json_link = create_download_link(export_data, f"dream_analysis_{dream_id}.json", "json")
-                    st.markdown(json_link, unsafe_allow_html=True)
+                except Exception as e:
+                    st.error(f"Error continuing conversation: {str(e)}")
+        
+        # Display conversation
+        for msg in st.session_state.dream_conversation:
+            if msg["role"] == "user":
+                st.markdown(chat_message("user", msg["content"]), unsafe_allow_html=True)
+            else:
+                st.markdown(chat_message("analyst", msg["content"]), unsafe_allow_html=True)
+
+@st.fragment
+def show_therapist_panel(llm_client):
+    """Therapist chat; a message reruns only this panel"""
+    st.markdown('<div class="dream-card">', unsafe_allow_html=True)
+    st.subheader("Talk to Our Therapist")
+    st.write("Get emotional support and guidance from our AI therapist.")
+    
+    # Initialize therapist conversation
+    if 'therapist_conversation' not in st.session_state:
+        st.session_state.therapist_conversation = []
+        st.session_state.therapist_memory = new_conversation_memory()
+    
+    if not st.session_state.therapist_conversation:
+        welcome_message = "Hello! I'm here to provide support and a space for reflection. I'd love to understand how you're feeling today and what's on your mind. How are you doing?"
+        st.session_state.therapist_conversation.append({
+            "role": "therapist",
+            "content": welcome_message
+        })
+    
+    # Display conversation
+    for msg in st.session_state.therapist_conversation:
+        if msg["role"] == "user":
+            st.markdown(chat_message("user", msg["content"]), unsafe_allow_html=True)
+        else:
+            st.markdown(chat_message("therapist", msg["content"]), unsafe_allow_html=True)
+    
+    # A new exchange is drawn here, under the history, while the reply streams
+    new_exchange = st.container()
+    
+    # Chat input
+    user_input = st.text_input("Your message:", key="therapist_input", placeholder="Share what's on your mind...")
+    
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        if st.button("Send", key="send_therapist"):
+            if user_input.strip():
+                st.session_state.therapist_conversation.append({
+                    "role": "user",
+                    "content": user_input
+                })
                 
-                with col3:
-                    text_content = f"DREAM ANALYSIS REPORT\n\nDate: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\nDream:\n{dream_text}\n\nAnalysis:\n{analysis}\n\nMood: {mood}\nEmotions: {', '.join(emotions)}\nKeywords: {', '.join(keywords)}"
-                    text_link = create_download_link(text_content, f"dream_report_{dream_id}.txt", "txt")
-                    st.markdown(text_link, unsafe_allow_html=True)
+                if STREAM_RESPONSES:
+                    with new_exchange:
+                        st.markdown(chat_message("user", user_input), unsafe_allow_html=True)
+                        response = render_stream(therapist_chat_stream(
+                            user_input, 
+                            st.session_state.therapist_conversation[:-1], 
+                            llm_client, 
+                            st.session_state.user_email,
+                            st.session_state.therapist_memory
+                        ), "therapist")
+                else:
+                    with st.spinner("Therapist is thinking..."):
+                        response = therapist_chat(
+                            user_input, 
+                            st.session_state.therapist_conversation[:-1], 
+                            llm_client, 
+                            st.session_state.user_email,
+                            st.session_state.therapist_memory
+                        )
                 
-                # Store for continued conversation
-                st.session_state.current_dream_session = {
-                    "dream_text": dream_text,
-                    "analysis": analysis,
-                    "conversation": conversation,
-                    "dream_id": dream_id
-                }
+                st.session_state.therapist_conversation.append({
+                    "role": "therapist",
+                    "content": response
+                })
                 
-            else:
-                st.error("Please describe your dream.")
+                st.rerun(scope="fragment")
+    
+    with col2:
+        if st.button("Clear Conversation", key="clear_therapist"):
+            st.session_state.therapist_conversation = []
+            st.session_state.therapist_memory.reset()
+            st.rerun(scope="fragment")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def show_history_panel(dream_repo):
+    """Dream History search, pages and full views; interactions rerun only this panel"""
+    from repository import HISTORY_PREVIEW_CHARS
+    
+    st.markdown('<div class="dream-card">', unsafe_allow_html=True)
+    st.subheader("Your Dream History")
+    
+    # Search and filter options
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        search_term = st.text_input("&#128269; Search dreams:", placeholder="Enter keywords...")
+    
+    with col2:
+        date_filter = st.date_input("&#128197; Filter by date:", value=None)
+    
+    with col3:
+        mood_options = ["All"] + [mood.title() for mood in MOOD_OPTIONS]
+        mood_filter = st.selectbox("&#128522; Filter by mood:", mood_options)
+    
+    if dream_repo is not None:
+        # Go back to the first page whenever the filters change
+        history_filters = (search_term, date_filter, mood_filter)
+        if st.session_state.get('history_filters') != history_filters:
+            st.session_state.history_filters = history_filters
+            st.session_state.history_pages = [None]
         
-        # Continue conversation
-        if hasattr(st.session_state, 'current_dream_session'):
-            st.markdown("### &#128172; Continue Conversation")
-            
-            if 'dream_conversation' not in st.session_state:
-                st.session_state.dream_conversation = [
-                    {"role": "analyst", "content": st.session_state.current_dream_session['analysis']}
-                ]
-            
-            user_response = st.text_input("Ask questions or share more details...", key="dream_followup")
+        # Each entry is what the page starts after: the previous page's last dream, or a skip count when searching
+        page_start = st.session_state.history_pages[-1]
+        page_number = len(st.session_state.history_pages)
+        searching = bool(search_words(search_term))
+        
+        filtered_dreams = search_user_dreams(
+            dream_repo, 
+            st.session_state.user_email, 
+            search_term if search_term else None,
+            date_filter,
+            mood_filter,
+            after=None if searching else page_start,
+            skip=(page_start or 0) if searching else 0,
+            limit=HISTORY_PAGE_SIZE + 1
+        )
+        has_next_page = len(filtered_dreams) > HISTORY_PAGE_SIZE
+        filtered_dreams = filtered_dreams[:HISTORY_PAGE_SIZE]
+        
+        if filtered_dreams:
+            first_shown = (page_number - 1) * HISTORY_PAGE_SIZE + 1
+            st.write(f"Showing dreams {first_shown}-{first_shown + len(filtered_dreams) - 1}")
             
-            if st.button("Send Message", key="send_dream_msg"):
-                if user_response.strip():
-                    st.session_state.dream_conversation.append({
-                        "role": "user",
-                        "content": user_response
-                    })
+            for dream in filtered_dreams:
+                with st.expander(f"&#127769; Dream from {dream['date'].strftime('%Y-%m-%d %H:%M')}"):
+                    # Dream content
+                    st.write("**Dream:**")
+                    st.write(dream['dream_text'][:HISTORY_PREVIEW_CHARS] + "..." if len(dream['dream_text']) > HISTORY_PREVIEW_CHARS else dream['dream_text'])
                     
-                    conversation_context = f"Dream: {st.session_state.current_dream_session['dream_text']}\n\n"
-                    for msg in st.session_state.dream_conversation:
-                        role = "Dream Analyst" if msg["role"] == "analyst" else "User"
-                        conversation_context += f"{role}: {msg['content']}\n\n"
+                    # Mood and emotions
+                    if dream.get('mood'):
+                        st.markdown(MOOD_BADGE.format(mood=dream["mood"], label=f'Mood: {dream["mood"].title()}'), unsafe_allow_html=True)
                     
-                    system_prompt = """Continue the dream analysis conversation naturally. 
-                    Be supportive and insightful. Ask only one question per response.
-                    Watch for any mental health concerns and provide appropriate resources if needed."""
+                    if dream.get('emotions'):
+                        for emotion in dream['emotions'][:3]:
+                            st.markdown(MOOD_BADGE.format(mood="neutral", label=emotion), unsafe_allow_html=True)
                     
-                    messages = [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"{conversation_context}User's latest message: {user_response}"}
-                    ]
+                    # Actions
+                    col1, col2 = st.columns(2)
                     
-                    try:
-                        response = mistral_client.chat.complete(
-                            model="mistral-large-latest",
-                            messages=messages,
-                            temperature=0.7
-                        )
-                        
-                        ai_response = response.choices[0].message.content
-                        st.session_state.dream_conversation.append({
-                            "role": "analyst",
-                            "content": ai_response
-                        })
-                        
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error continuing conversation: {str(e)}")
+                    with col1:
+                        # Kept in session state so the buttons inside the full view survive their reruns
+                        if st.button(f"View Full Analysis", key=f"view_{dream['_id']}"):
+                            st.session_state.open_dream_id = dream['_id']
+                    
+                    with col2:
+                        share_text = f"Dream from {dream['date'].strftime('%Y-%m-%d')}: {dream['dream_text'][:100]}..."
+                        twitter_url = f"https://twitter.com/intent/tweet?text={share_text.replace(' ', '%20')}"
+                        st.markdown(SHARE_LINK.format(url=twitter_url, label="&#128038; Share"), unsafe_allow_html=True)
+                    
+                    if st.session_state.get('open_dream_id') == dream['_id']:
+                        full_dream = dream_repo.get(st.session_state.user_email, dream['_id'])
+                        if full_dream:
+                            st.markdown(f"**Full Analysis:**\n\n{full_dream.get('analysis') or 'No analysis available.'}")
+                            version = (str(full_dream['_id']), dream_repo.cache.version(st.session_state.user_email))
+                            show_download_buttons(dream_record(full_dream), f"dream_{full_dream['_id']}", version)
             
-            # Display conversation
-            for msg in st.session_state.dream_conversation:
-                if msg["role"] == "user":
-                    st.markdown(f'<div class="chat-message user-message"><strong>You:</strong> {msg["content"]}</div>', unsafe_allow_html=True)
-                else:
-                    st.markdown(f'<div class="chat-message analyst-message"><strong>&#128302; Dream Analyst:</strong> {msg["content"]}</div>', unsafe_allow_html=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with tab2:
-        st.markdown('<div class="dream-card">', unsafe_allow_html=True)
-        st.subheader("Talk to Our Therapist")
-        st.write("Get emotional support and guidance from our AI therapist.")
-        
-        # Initialize therapist conversation
-        if 'therapist_conversation' not in st.session_state:
-            st.session_state.therapist_conversation = []
+            # Pagination
+            col1, col2 = st.columns(2)
             
-        if not st.session_state.therapist_conversation:
-            welcome_message = "Hello! I'm here to provide support and a space for reflection. I'd love to understand how you're feeling today and what's on your mind. How are you doing?"
-            st.session_state.therapist_conversation.append({
-                "role": "therapist",
-                "content": welcome_message
-            })
+            with col1:
+                if page_number > 1 and st.button("Previous page", key="history_prev"):
+                    st.session_state.history_pages.pop()
+                    st.rerun(scope="fragment")
+            
+            with col2:
+                if has_next_page and st.button("Next page", key="history_next"):
+                    next_start = (page_start or 0) + HISTORY_PAGE_SIZE if searching else filtered_dreams[-1]
+                    st.session_state.history_pages.append(next_start)
+                    st.rerun(scope="fragment")
+        else:
+            st.info("No dreams found matching your criteria. Try adjusting your filters or record your first dream!")
         
-        # Display conversation
-        for msg in st.session_state.therapist_conversation:
-            if msg["role"] == "user":
-                st.markdown(f'<div class="chat-message user-message"><strong>You:</strong> {msg["content"]}</div>', unsafe_allow_html=True)
-            else:
-                st.markdown(f'<div class="chat-message therapist-message"><strong>&#129489;&#8205;&#9877;&#65039; Therapist:</strong> {msg["content"]}</div>', unsafe_allow_html=True)
+        show_journal_transfer(dream_repo, st.session_state.user_email)
+    else:
+        st.error("Unable to connect to dream database.")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def show_analytics_panel(dream_repo):
+    """Charts, insights and the analytics export"""
+    st.markdown('<div class="dream-card">', unsafe_allow_html=True)
+    st.subheader("Dream Analytics & Insights")
+    
+    # Loaded here rather than passed in so a fragment rerun sees dreams saved since the last full run.
+    # The version is read first so the export is never keyed newer than its statistics.
+    version = ("analytics", st.session_state.user_email, dream_repo.cache.version(st.session_state.user_email)) if dream_repo is not None else None
+    stats = get_dream_statistics(dream_repo, st.session_state.user_email)
+    
+    if stats and stats['total_dreams'] > 0:
+        # Charts are the expensive part of the tab, so they are drawn only on request
+        if st.toggle("Show charts", key="show_analytics_charts"):
+            for heading, figure in get_analytics_figures(dream_repo, st.session_state.user_email, stats):
+                st.markdown(heading)
+                st.plotly_chart(figure, use_container_width=True)
         
-        # Chat input
-        user_input = st.text_input("Your message:", key="therapist_input", placeholder="Share what's on your mind...")
+        # Dream insights
+        st.markdown("#### &#129504; Personalized Insights")
+        for insight in dream_insights(stats):
+            st.info(insight)
         
-        col1, col2 = st.columns([1, 4])
-        with col1:
-            if st.button("Send", key="send_therapist"):
-                if user_input.strip():
-                    st.session_state.therapist_conversation.append({
-                        "role": "user",
-                        "content": user_input
-                    })
-                    
-                    with st.spinner("Therapist is thinking..."):
-                        response = therapist_chat(
-                            user_input, 
-                            st.session_state.therapist_conversation[:-1], 
-                            mistral_client, 
-                            st.session_state.user_email
-                        )
-                    
-                    st.session_state.therapist_conversation.append({
-                        "role": "therapist",
-                        "content": response
-                    })
-                    
-                    st.rerun()
+        # Export full analytics
+        st.markdown("#### &#128202; Export Your Data")
         
-        with col2:
-            if st.button("Clear Conversation", key="clear_therapist"):
-                st.session_state.therapist_conversation = []
-                st.rerun()
+        full_analytics = {
+            "user_email": st.session_state.user_email,
+            "generated_at": datetime.now().isoformat(),
+            "statistics": stats,
+            "total_dreams_analyzed": stats['total_dreams']
+        }
         
-        st.markdown('</div>', unsafe_allow_html=True)
+        show_download_buttons(full_analytics, "dream_analytics_report", version, formats=("json",))
     
-    with tab3:
-        st.markdown('<div class="dream-card">', unsafe_allow_html=True)
-        st.subheader("Your Dream History")
-        
-        # Search and filter options
-        col1, col2, col3 = st.columns(3)
+    else:
+        st.info("Record more dreams to unlock detailed analytics! Start by analyzing your first dream in the 'Analyze Dream' tab.")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def show_stats_cards(dream_repo):
+    """Dashboard statistics cards"""
+    stats = get_dream_statistics(dream_repo, st.session_state.user_email)
+    
+    # Display statistics cards
+    if stats:
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            search_term = st.text_input("&#128269; Search dreams:", placeholder="Enter keywords...")
+            st.markdown(STATS_CARD.format(value=stats['total_dreams'], label="Total Dreams"), unsafe_allow_html=True)
         
         with col2:
-            date_filter = st.date_input("&#128197; Filter by date:", value=None)
+            st.markdown(STATS_CARD.format(value=stats['days_since_last'], label="Days Since Last"), unsafe_allow_html=True)
         
         with col3:
-            mood_options = ["All", "Positive", "Neutral", "Negative", "Mysterious"]
-            mood_filter = st.selectbox("&#128522; Filter by mood:", mood_options)
-        
-        if dreams_collection is not None:
-            filtered_dreams = search_user_dreams(
-                dreams_collection, 
-                st.session_state.user_email, 
-                search_term if search_term else None,
-                date_filter,
-                mood_filter
-            )
-            
-            if filtered_dreams:
-                st.write(f"Found {len(filtered_dreams)} dreams")
-                
-                for dream in filtered_dreams:
-                    with st.expander(f"&#127769; Dream from {dream['date'].strftime('%Y-%m-%d %H:%M')}"):
-                        # Dream content
-                        st.write("**Dream:**")
-                        st.write(dream['dream_text'][:300] + "..." if len(dream['dream_text']) > 300 else dream['dream_text'])
-                        
-                        # Mood and emotions
-                        if dream.get('mood'):
-                            st.markdown(f'<div class="mood-indicator mood-{dream["mood"]}">Mood: {dream["mood"].title()}</div>', unsafe_allow_html=True)
-                        
-                        if dream.get('emotions'):
-                            for emotion in dream['emotions'][:3]:
-                                st.markdown(f'<div class="mood-indicator mood-neutral">{emotion}</div>', unsafe_allow_html=True)
-                        
-                        # Actions
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            if st.button(f"View Full Analysis", key=f"view_{dream['_id']}"):
-                                st.markdown(f"**Full Analysis:**\n\n{dream.get('analysis', 'No analysis available.')}")
-                        
-                        with col2:
-                            dream_content = f"Dream from {dream['date'].strftime('%Y-%m-%d')}\n\nDream: {dream['dream_text']}\n\nAnalysis: {dream.get('analysis', '')}"
-                            download_link = create_download_link(dream_content, f"dream_{dream['_id']}.txt")
-                            st.markdown(download_link, unsafe_allow_html=True)
-                        
-                        with col3:
-                            share_text = f"Dream from {dream['date'].strftime('%Y-%m-%d')}: {dream['dream_text'][:100]}..."
-                            twitter_url = f"https://twitter.com/intent/tweet?text={share_text.replace(' ', '%20')}"
-                            st.markdown(f'<a href="{twitter_url}" target="_blank" class="share-btn">&#128038; Share</a>', unsafe_allow_html=True)
-            else:
-                st.info("No dreams found matching your criteria. Try adjusting your filters or record your first dream!")
-        else:
-            st.error("Unable to connect to dream database.")
+            most_common_keyword = stats['most_common_keywords'][0][0] if stats['most_common_keywords'] else "None"
+            st.markdown(STATS_CARD.format(value=f'"{most_common_keyword}"', label="Top Symbol"), unsafe_allow_html=True)
         
-        st.markdown('</div>', unsafe_allow_html=True)
+        with col4:
+            most_common_mood = max(stats['mood_distribution'].items(), key=lambda x: x[1])[0] if stats['mood_distribution'] else "neutral"
+            st.markdown(STATS_CARD.format(value=most_common_mood.title(), label="Common Mood"), unsafe_allow_html=True)
+
+def show_dashboard():
+    """Display user dashboard"""
+    load_css()
+    
+    _, user_repo, dream_repo, llm_client = initialize_clients()
+    
+    # This run draws the stats cards with every save so far
+    st.session_state.pop("saved_since_full_run", None)
+    
+    st.markdown('<h1 class="dream-title">&#127775;&#10024; Your Dream Journey &#10024;&#127775;</h1>', unsafe_allow_html=True)
+    
+    # User info and logout - FIXED: Email now uses user-email class
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown(f'<div class="user-email">Welcome back, {st.session_state.user_email}!</div>', unsafe_allow_html=True)
+    with col2:
+        if st.button("Logout"):
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            st.session_state.page = "home"
+            st.rerun()
+    
+    show_stats_cards(dream_repo)
+    
+    # Main dashboard tabs
+    tab1, tab2, tab3, tab4 = st.tabs(["&#128302; Analyze Dream", "&#129489;&#8205;&#9877;&#65039; Talk to Therapist", "&#128216; Dream History", "&#128202; Analytics"])
+    
+    with tab1:
+        show_analyze_panel(dream_repo, llm_client)
+    
+    with tab2:
+        show_therapist_panel(llm_client)
+    
+    with tab3:
+        show_history_panel(dream_repo)
     
     with tab4:
-        st.markdown('<div class="dream-card">', unsafe_allow_html=True)
-        st.subheader("Dream Analytics & Insights")
-        
-        if stats and stats['total_dreams'] > 0:
-            # Mood distribution pie chart
-            if stats['mood_distribution']:
-                st.markdown("#### &#128522; Mood Distribution")
-                mood_df = pd.DataFrame(list(stats['mood_distribution'].items()), columns=['Mood', 'Count'])
-                fig_mood = px.pie(mood_df, values='Count', names='Mood', 
-                                color_discrete_sequence=px.colors.qualitative.Set3)
-                fig_mood.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white'
-                )
-                st.plotly_chart(fig_mood, use_container_width=True)
-            
-            # Keyword frequency bar chart
-            if stats['most_common_keywords']:
-                st.markdown("#### &#128273; Most Common Dream Symbols")
-                keywords_df = pd.DataFrame(stats['most_common_keywords'], columns=['Keyword', 'Frequency'])
-                fig_keywords = px.bar(keywords_df, x='Keyword', y='Frequency',
-                                    color='Frequency', color_continuous_scale='viridis')
-                fig_keywords.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white',
-                    xaxis=dict(showgrid=False),
-                    yaxis=dict(showgrid=False)
-                )
-                st.plotly_chart(fig_keywords, use_container_width=True)
-            
-            # Monthly dream frequency
-            if stats['monthly_counts']:
-                st.markdown("#### &#128197; Dreams Over Time")
-                monthly_df = pd.DataFrame(list(stats['monthly_counts'].items()), columns=['Month', 'Dreams'])
-                monthly_df['Month'] = pd.to_datetime(monthly_df['Month'])
-                monthly_df = monthly_df.sort_values('Month')
-                
-                fig_monthly = px.line(monthly_df, x='Month', y='Dreams', 
-                                    markers=True, line_shape='spline')
-                fig_monthly.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white',
-                    xaxis=dict(showgrid=False),
-                    yaxis=dict(showgrid=False)
-                )
-                fig_monthly.update_traces(line_color='#4ECDC4', marker_color='#FF6B6B')
-                st.plotly_chart(fig_monthly, use_container_width=True)
-            
-            # Emotion analysis
-            if stats['most_common_emotions']:
-                st.markdown("#### &#10084;&#65039; Emotional Patterns")
-                emotions_df = pd.DataFrame(stats['most_common_emotions'], columns=['Emotion', 'Frequency'])
-                fig_emotions = px.bar(emotions_df, x='Emotion', y='Frequency', 
-                                    color='Frequency', color_continuous_scale='plasma')
-                fig_emotions.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white',
-                    xaxis=dict(showgrid=False),
-                    yaxis=dict(showgrid=False)
-                )
-                st.plotly_chart(fig_emotions, use_container_width=True)
-            
-            # Dream insights
-            st.markdown("#### &#129504; Personalized Insights")
-            
-            insights = []
-            if stats['total_dreams'] >= 5:
-                insights.append(f"&#127775; You're an active dreamer with {stats['total_dreams']} recorded dreams!")
-            
-            if stats['days_since_last'] == 0:
-                insights.append("&#127381; You recorded a dream today - great job staying consistent!")
-            elif stats['days_since_last'] <= 3:
-                insights.append(f"&#9203; It's been {stats['days_since_last']} days since your last dream - keep up the good work!")
-            
-            if stats['most_common_keywords']:
-                top_symbol = stats['most_common_keywords'][0][0]
-                insights.append(f"&#128302; '{top_symbol}' appears frequently in your dreams - this might be a significant symbol for you.")
-            
-            if stats['mood_distribution']:
-                dominant_mood = max(stats['mood_distribution'].items(), key=lambda x: x[1])[0]
-                insights.append(f"&#128522; Your dreams tend to be {dominant_mood}, which may reflect your subconscious emotional state.")
-            
-            for insight in insights:
-                st.info(insight)
-            
-            # Export full analytics
-            st.markdown("#### &#128202; Export Your Data")
-            
-            full_analytics = {
-                "user_email": st.session_state.user_email,
-                "generated_at": datetime.now().isoformat(),
-                "statistics": stats,
-                "total_dreams_analyzed": stats['total_dreams']
-            }
-            
-            analytics_link = create_download_link(full_analytics, "dream_analytics_report.json", "json")
-            st.markdown(analytics_link, unsafe_allow_html=True)
-        
-        else:
-            st.info("Record more dreams to unlock detailed analytics! Start by analyzing your first dream in the 'Analyze Dream' tab.")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+        show_analytics_panel(dream_repo)
 
 # Main app logic
 def main():
@@ -1493,6 +1754,21 @@ def main():
     if 'page' not in st.session_state:
         st.session_state.page = "home"
     
+    # Start connecting in the background so the database is ready by the time a page needs it
+    get_mongo_manager()
+    
+    # Operator view of per-task model latency, token usage and database query timings
+    if os.getenv("SHOW_LLM_METRICS", "false").lower() in ("1", "true", "yes"):
+        with st.sidebar.expander("LLM metrics"):
+            st.dataframe(get_llm_metrics().snapshot(), use_container_width=True)
+            st.json(get_llm_cache().stats())
+        with st.sidebar.expander("Database queries"):
+            st.dataframe(get_query_timings().snapshot(), use_container_width=True)
+            st.json(get_read_cache().stats())
+            st.json(get_mongo_manager().status())
+        for problem in get_mongo_manager().connect_result or []:
+            st.sidebar.warning(f"Database: {problem}")
+    
     # Route to appropriate page
     if st.session_state.page == "home":
         show_homepage()
@@ -0,0 +1,77 @@
+"""Rerun cost of the Analytics tab with and without the figure cache
+
+Simulates dashboard reruns for a user whose data has not changed. Each
+rerun gets the figures (building them, or reading them from a ReadCache as
+app.get_analytics_figures does) and serializes them the way st.plotly_chart
+does before sending them to the browser. A final pass bumps the user's
+version before every rerun to show the cost right after a new dream.
+
+    python benchmarks/analytics_bench.py [--reruns N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import plotly.io  # noqa: E402
+
+from analytics import CHARTS, build_figures  # noqa: E402
+from read_cache import ReadCache  # noqa: E402
+
+USER = "bench@example.com"
+
+STATS = {
+    "total_dreams": 240,
+    "days_since_last": 1,
+    "most_common_keywords": [("water", 31), ("house", 24), ("flying", 19), ("forest", 12), ("train", 9)],
+    "mood_distribution": {"positive": 88, "neutral": 97, "negative": 55},
+    "most_common_emotions": [("curiosity", 40), ("fear", 28), ("joy", 21)],
+    "monthly_counts": {f"2026-{month:02d}": 30 + month for month in range(4, 10)}
+}
+
+
+def cached_figures(cache, stats):
+    chart_data = {field: stats.get(field) for field, _, _ in CHARTS}
+    return cache.get_or_load(USER, "analytics_figures", chart_data, lambda: build_figures(stats), copy_value=False)
+
+
+def rerun(get_figures):
+    """Milliseconds for one rerun of the charts"""
+    start = time.perf_counter()
+    for _, figure in get_figures():
+        plotly.io.to_json(figure, validate=False)
+    return (time.perf_counter() - start) * 1000
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    print(f"{label:<28} mean {mean:8.2f} ms   median {timings[len(timings) // 2]:8.2f} ms   max {timings[-1]:8.2f} ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    # Warm up imports and Plotly's lazy validators so neither side pays for them
+    build_figures(STATS)
+
+    cache = ReadCache()
+    uncached = report("no cache", [rerun(lambda: build_figures(STATS)) for _ in range(args.reruns)])
+    cached = report("cache, unchanged data", [rerun(lambda: cached_figures(cache, STATS)) for _ in range(args.reruns)])
+
+    def after_write():
+        cache.bump(USER)
+        return cached_figures(cache, STATS)
+
+    report("cache, new dream each rerun", [rerun(after_write) for _ in range(args.reruns)])
+    print(f"\nCache speedup on unchanged data: {uncached / cached:.1f}x over {args.reruns} reruns")
+    print("Hidden charts (the default) skip this work entirely.")
+
+
+if __name__ == "__main__":
+    main()
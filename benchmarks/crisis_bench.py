@@ -0,0 +1,130 @@
+"""Accuracy check and micro-benchmark for the crisis phrase matcher
+
+Runs the compiled matcher in crisis.py and the old per-phrase substring scan
+over a labelled corpus, reports mislabels and timings, and exits non-zero if
+the compiled matcher gets any example wrong.
+
+On long texts with no crisis phrase the compiled matcher is slower than the
+old scan, which only ran a few C-level substring searches. Checking word
+boundaries means the regex engine visits every position; splitting the
+phrases into one literal-prefixed regex per leading word measured slower
+still, since that is sixteen passes over the text instead of one.
+
+    python benchmarks/crisis_bench.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from crisis import detect_crisis, find_country, find_crisis_matches  # noqa: E402
+
+# The substring list the app used before crisis.py, kept for comparison
+LEGACY_KEYWORDS = [
+    "suicid", "kill myself", "end my life", "don't want to live",
+    "self-harm", "cut myself", "hurt myself", "die", "death",
+    "hopeless", "no reason to live", "no point", "can't go on",
+    "give up", "too much pain", "better off without me"
+]
+
+# (text, expected crisis flag, expected categories)
+CORPUS = [
+    ("I keep thinking about suicide lately", True, {"suicide"}),
+    ("I've been feeling suicidal since the dream", True, {"suicide"}),
+    ("In the dream I wanted to kill myself", True, {"suicide"}),
+    ("Sometimes I want to end my life", True, {"suicide"}),
+    ("I don't want to live anymore", True, {"suicide"}),
+    ("I don’t want to live like this", True, {"suicide"}),
+    ("i dont want to live", True, {"suicide"}),
+    ("There is no reason to live", True, {"suicide"}),
+    ("Everyone would be better off without me", True, {"suicide"}),
+    ("I started to self-harm again", True, {"self_harm"}),
+    ("thoughts of self harm", True, {"self_harm"}),
+    ("I cut myself after waking up", True, {"self_harm"}),
+    ("I want to hurt myself", True, {"self_harm"}),
+    ("Everything feels hopeless", True, {"hopelessness"}),
+    ("I self-harmed last night", True, {"self_harm"}),
+    ("She self harms when she is stressed", True, {"self_harm"}),
+    ("I was suicidally depressed in the dream", True, {"suicide"}),
+    ("I feel hopelessly lost", True, {"hopelessness"}),
+    ("What's the point? There's no point", True, {"hopelessness"}),
+    ("I can't go on like this", True, {"hopelessness"}),
+    ("I can’t go on", True, {"hopelessness"}),
+    ("I just want to give up", True, {"hopelessness"}),
+    ("It's too much pain to carry", True, {"hopelessness"}),
+    ("I dreamt that I would die in a fire", True, {"death"}),
+    ("My grandmother died in the dream", True, {"death"}),
+    ("Everyone was dying around me", True, {"death"}),
+    ("I dreamt of my own death", True, {"death"}),
+    ("He dies at the end of the dream", True, {"death"}),
+    ("I feel HOPELESS and want to DIE", True, {"hopelessness", "death"}),
+    ("I was flying over a beautiful landscape", False, set()),
+    ("I started a new diet in my dream", False, set()),
+    ("I studied all night for an exam", False, set()),
+    ("The soldiers stood in the diesel smoke", False, set()),
+    ("A dietitian was chasing me", False, set()),
+    ("I was cutting vegetables with my mother", False, set()),
+    ("I found a pointed stone on the beach", False, set()),
+    ("We played a game of dice", False, set()),
+    ("I ate fresh ramen noodles", False, set()),
+    ("My friend Candie was at the party", False, set()),
+    ("The audience applauded my speech", False, set()),
+    ("I dreamt of a beautiful deathless garden", False, set()),
+    ("I was in the United Kingdom near a lake", False, set()),
+]
+
+COUNTRY_CORPUS = [
+    ("I'm in the UK", "uk"),
+    ("I live in India", "india"),
+    ("I'm from the United States", "united states"),
+    ("I play the ukulele", None),
+    ("I'm in Canada right now", "canada"),
+    ("Somewhere in Europe", None),
+]
+
+
+def legacy_detect(text):
+    return any(keyword in text.lower() for keyword in LEGACY_KEYWORDS)
+
+
+def main():
+    failures = 0
+    legacy_errors = 0
+
+    for text, expected, categories in CORPUS:
+        found = {match["category"] for match in find_crisis_matches(text)}
+        if detect_crisis(text) != expected or found != categories:
+            failures += 1
+            print(f"MISLABEL  {text!r}: expected {expected} {sorted(categories)}, got {sorted(found)}")
+        if legacy_detect(text) != expected:
+            legacy_errors += 1
+
+    for text, expected in COUNTRY_CORPUS:
+        if find_country(text) != expected:
+            failures += 1
+            print(f"MISLABEL  {text!r}: expected country {expected}, got {find_country(text)}")
+
+    print(f"compiled matcher: {len(CORPUS) - failures}/{len(CORPUS)} crisis examples correct")
+    print(f"legacy substring scan: {len(CORPUS) - legacy_errors}/{len(CORPUS)} correct")
+
+    texts = [text for text, _, _ in CORPUS]
+    # No crisis phrase anywhere, so every scan reads the whole text
+    long_text = " ".join(text for text, expected, _ in CORPUS if not expected) * 20
+    samples = (
+        ("short messages", texts),
+        ("typical dream (~{} chars)".format(len(long_text[:1500])), [long_text[:1500]]),
+        ("long dream (~{} chars)".format(len(long_text)), [long_text])
+    )
+    for label, sample in samples:
+        runs = 2000 if len(sample) > 1 else 500
+        compiled = timeit.timeit(lambda: [detect_crisis(text) for text in sample], number=runs)
+        legacy = timeit.timeit(lambda: [legacy_detect(text) for text in sample], number=runs)
+        per_call = len(sample) * runs
+        print(f"{label}: compiled {compiled / per_call * 1e6:.2f} us/call, legacy {legacy / per_call * 1e6:.2f} us/call")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Bytes sent per rerun for the page chrome and a chat, before and after markup.py
+
+Builds the ForwardMsgs Streamlit sends for the theme stylesheet, the
+dashboard stats cards and a chat of --messages bubbles, and runs them
+through Streamlit's message cache logic for a session of --reruns reruns:
+an element at least global.minCachedMessageSize bytes is sent in full
+once, then as a hash reference while the browser still holds it.
+
+"before" is the old inline <style> markdown and indented card markup under
+the default cache threshold; "after" is the compacted stylesheet sent with
+st.html, the compacted templates and the threshold from
+.streamlit/config.toml.
+
+    python benchmarks/payload_bench.py [--reruns N] [--messages N]
+"""
+import argparse
+import os
+import sys
+import tomllib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from streamlit import config  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from streamlit.runtime.forward_msg_cache import create_reference_msg, populate_hash_if_needed  # noqa: E402
+
+from markup import STATS_CARD, THEME_CSS, THEME_CSS_SOURCE, chat_message  # noqa: E402
+
+DEFAULT_MIN_CACHED_MESSAGE_SIZE = 10 * 1e3
+
+# The stats card as app.py wrote it before markup.py, indentation included
+LEGACY_STATS_CARD = '''
+            <div class="stats-card">
+                <div class="stat-number">{value}</div>
+                <div class="stat-label">{label}</div>
+            </div>
+            '''
+
+STATS = [(42, "Total Dreams"), (1, "Days Since Last"), ('"water"', "Top Symbol"), ("Mysterious", "Common Mood")]
+CHAT_TEXT = "In dreams, water often mirrors the emotional current beneath waking life. " * 4
+
+
+def element(body, kind="markdown"):
+    msg = ForwardMsg()
+    if kind == "html":
+        msg.delta.new_element.html.body = body
+    else:
+        msg.delta.new_element.markdown.body = body
+        msg.delta.new_element.markdown.allow_html = True
+    return msg
+
+
+def rerun_elements(stylesheet, card, messages):
+    """The messages one dashboard rerun sends, in order"""
+    yield stylesheet()
+    for value, label in STATS:
+        yield element(card.format(value=value, label=label))
+    for i in range(messages):
+        yield element(chat_message("user" if i % 2 == 0 else "analyst", CHAT_TEXT))
+
+
+def session_bytes(stylesheet, card, messages, reruns, min_cached_size):
+    """Bytes sent on the first rerun and on each later one"""
+    config.set_option("global.minCachedMessageSize", min_cached_size)
+    browser_cache = set()
+    sizes = []
+    for _ in range(reruns):
+        sent = 0
+        for msg in rerun_elements(stylesheet, card, messages):
+            populate_hash_if_needed(msg)
+            if msg.metadata.cacheable and msg.hash in browser_cache:
+                msg = create_reference_msg(msg)
+            elif msg.metadata.cacheable:
+                browser_cache.add(msg.hash)
+            sent += len(msg.SerializeToString())
+        sizes.append(sent)
+    return sizes[0], sizes[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=10)
+    args = parser.parse_args()
+    if args.reruns < 2:
+        parser.error("--reruns must be at least 2")
+
+    with open(os.path.join(ROOT, ".streamlit", "config.toml"), "rb") as f:
+        min_cached_size = tomllib.load(f).get("global", {}).get("minCachedMessageSize", DEFAULT_MIN_CACHED_MESSAGE_SIZE)
+
+    before = session_bytes(lambda: element(THEME_CSS_SOURCE), LEGACY_STATS_CARD, args.messages, args.reruns, DEFAULT_MIN_CACHED_MESSAGE_SIZE)
+    after = session_bytes(lambda: element(THEME_CSS, "html"), STATS_CARD, args.messages, args.reruns, min_cached_size)
+
+    print(f"Dashboard with {args.messages} chat messages, {args.reruns} reruns")
+    for label, (first, later) in (("before", before), ("after", after)):
+        print(f"  {label:<7} first rerun {first:7d} B   each later rerun {later[0]:7d} B   session {first + sum(later):9d} B")
+    saved = before[1][0] - after[1][0]
+    print(f"\nSaved per rerun: {saved} B ({100 * saved / before[1][0]:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
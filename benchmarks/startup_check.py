@@ -0,0 +1,92 @@
+"""Cold import time check for app.py
+
+Imports the app in fresh interpreters under `python -X importtime`, prints
+the heaviest modules it pulls in, and exits non-zero if the median import
+time is over budget or if the app itself (not Streamlit) imports a
+dependency that is meant to load lazily: pandas, Plotly, pymongo, bson or
+mistralai.
+
+    python benchmarks/startup_check.py [--budget-ms N] [--runs N] [--top N]
+
+The default budget sits between the ~700 ms the app takes with lazy
+imports and the ~1250 ms it took with them eager (Streamlit alone is about
+500 ms of either) on a development machine; CI and deploy images should
+pass one measured on their own hardware.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+DEFAULT_BUDGET_MS = 1000
+
+# Only the pages or threads that need these import them
+LAZY_MODULES = ("pandas", "plotly", "pymongo", "bson", "mistralai")
+
+
+def profile_import(module="app"):
+    """One cold import: (total microseconds, every module imported, [(cumulative us, name)] of module's direct imports)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    log = [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+    if result.returncode != 0:
+        errors = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"import {module} failed:\n{errors}")
+
+    total = 0
+    imported = set()
+    children = []
+    direct = []
+    # import time: self [us] | cumulative | imported package
+    # A package is listed after everything it imported, indented one level deeper
+    for line in log[1:]:
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        imported.add(name)
+        if depth == 1:
+            children.append((int(cumulative), name))
+        elif depth == 0:
+            total += int(cumulative)
+            if name == module:
+                direct = sorted(children, reverse=True)
+            children = []
+    return total, imported, direct
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if app.py's cold import time regresses")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = sorted((profile_import() for _ in range(args.runs)), key=lambda run: run[0])
+    median, imported, direct = runs[len(runs) // 2]
+    median_ms = median / 1000
+    streamlit_total, streamlit_imported, _ = profile_import("streamlit")
+
+    print("Heaviest imports under app in the median run (cumulative ms):")
+    for cumulative, name in direct[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}  {name}")
+
+    failures = []
+    eager = sorted({name.split(".")[0] for name in imported - streamlit_imported} & set(LAZY_MODULES))
+    if eager:
+        failures.append(f"imported at startup but meant to load lazily: {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    print(f"\nMedian cold import over {args.runs} runs: {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Streamlit alone: {streamlit_total / 1000:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Token-budgeted rolling memory for chat conversations
+
+The most recent turns are kept verbatim; turns that fall out of that window
+are folded into a running summary. Only the newly evicted turns are passed to
+the summarizer, so the history is never re-summarized from scratch.
+"""
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+class ConversationMemory:
+    """Running summary plus a verbatim window of recent turns"""
+
+    def __init__(self, token_budget=1500, recent_turns=6):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.summary = ""
+        self.summarized_count = 0
+
+    def reset(self):
+        """Forget the summary, e.g. when the conversation is cleared"""
+        self.summary = ""
+        self.summarized_count = 0
+
+    def update(self, history, summarize):
+        """Fold turns outside the window into the summary and return (summary, recent turns)
+
+        summarize(previous_summary, new_turns) must return the updated summary.
+        The window shrinks further while it exceeds the token budget, but the
+        latest turn is always kept verbatim.
+        """
+        if len(history) < self.summarized_count:
+            self.reset()
+
+        keep_from = max(self.summarized_count, len(history) - self.recent_turns)
+        while keep_from < len(history) - 1 and self._tokens(history[keep_from:]) > self.token_budget:
+            keep_from += 1
+
+        if keep_from > self.summarized_count:
+            self.summary = summarize(self.summary, history[self.summarized_count:keep_from])
+            self.summarized_count = keep_from
+
+        return self.summary, history[self.summarized_count:]
+
+    def _tokens(self, turns):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(turn["content"]) for turn in turns)
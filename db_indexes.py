@@ -0,0 +1,136 @@
+"""MongoDB index provisioning and query plan checks
+
+ensure_indexes creates the indexes behind the app's hot queries: login and
+registration look users up by email, and the dashboard lists, filters and
+counts a user's dreams newest first. Each index is created on its own, so
+one that conflicts with an existing index or with the data (duplicate
+emails or content hashes) doesn't keep the others from being built.
+Creating an index that already exists is a no-op, so this is safe to
+run on every process start.
+
+check_query_plans runs explain() on those same queries and reports any that
+still scan the whole collection or sort in memory.
+"""
+from datetime import datetime
+
+import pymongo
+from bson import ObjectId
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+
+# Dream History order; _id breaks ties between dreams saved in the same millisecond
+HISTORY_ORDER = [("date", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", pymongo.ASCENDING)], unique=True, name="email_unique")
+    ],
+    "dreams": [
+        # History pages (keyset on date, _id), previous-dream context and statistics, newest first
+        IndexModel(
+            [("user_email", pymongo.ASCENDING), ("date", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+            name="user_date_id"
+        ),
+        # Mood filter in Dream History
+        IndexModel(
+            [
+                ("user_email", pymongo.ASCENDING),
+                ("mood", pymongo.ASCENDING),
+                ("date", pymongo.DESCENDING),
+                ("_id", pymongo.DESCENDING)
+            ],
+            name="user_mood_date_id"
+        ),
+        # Keyword lookups (multikey, one entry per keyword)
+        IndexModel([("user_email", pymongo.ASCENDING), ("keywords", pymongo.ASCENDING)], name="user_keywords"),
+        # Duplicate detection for journal imports; documents saved before content_hash existed are exempt
+        IndexModel(
+            [("user_email", pymongo.ASCENDING), ("content_hash", pymongo.ASCENDING)],
+            name="user_content_hash",
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}}
+        ),
+        # Dream History search: stemmed English words, keywords weighted above the narrative
+        IndexModel(
+            [("user_email", pymongo.ASCENDING), ("dream_text", pymongo.TEXT), ("keywords", pymongo.TEXT)],
+            name="user_text",
+            weights={"keywords": 5, "dream_text": 1},
+            default_language="english"
+        )
+    ]
+}
+
+
+def ensure_indexes(db):
+    """Create any missing indexes; return a problem per index that couldn't be created, empty if all went well"""
+    problems = []
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                db[collection_name].create_indexes([index])
+            except PyMongoError as e:
+                # E.g. duplicate values blocking a unique index, or the same keys under another name;
+                # the app still works without it, only slower or without import deduplication
+                problems.append(f"Could not create index {index.document['name']} on {collection_name}: {e}")
+    return problems
+
+
+def plan_stages(plan):
+    """All stage names in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key in ("inputStage", "queryPlan", "thenStage", "elseStage"):
+            stages.extend(plan_stages(plan.get(key)))
+        for child in plan.get("inputStages", []):
+            stages.extend(plan_stages(child))
+    return stages
+
+
+# A Dream History page plus one, as app.py fetches it
+HISTORY_PROBE_LIMIT = 11
+
+# Sorting by relevance is always in memory, so only the match itself is checked
+SORTED_IN_MEMORY = ("text search",)
+
+
+def hot_queries(db, user_email):
+    """The app's frequent queries as (label, cursor) pairs, built by the repository methods that run them"""
+    # repository imports HISTORY_ORDER from this module
+    from repository import DreamRepository, UserRepository
+    from user_stats import MOOD_OPTIONS
+
+    today = datetime.now().date()
+    day = (datetime.combine(today, datetime.min.time()), datetime.combine(today, datetime.max.time()))
+    dreams = DreamRepository(db["dreams"])
+    last_dream = {"date": day[0], "_id": ObjectId()}
+    return [
+        ("login/register by email", UserRepository(db["users"]).by_email(user_email)),
+        ("previous dreams", dreams.recent_cursor(user_email)),
+        ("dream history", dreams.list_cursor(user_email, limit=HISTORY_PROBE_LIMIT)),
+        ("dream history next page", dreams.list_cursor(user_email, after=last_dream, limit=HISTORY_PROBE_LIMIT)),
+        ("history by date", dreams.list_cursor(user_email, date_range=day, limit=HISTORY_PROBE_LIMIT)),
+        ("history by mood", dreams.list_cursor(user_email, mood=MOOD_OPTIONS[0], limit=HISTORY_PROBE_LIMIT)),
+        ("text search", dreams.text_cursor(user_email, ["water"], limit=HISTORY_PROBE_LIMIT)),
+        ("dream detail", dreams.get_cursor(user_email, ObjectId())),
+        ("journal export", dreams.export_cursor(user_email)),
+        ("statistics", dreams.stats_cursor(user_email))
+    ]
+
+
+def check_query_plans(db, user_email=""):
+    """Explain each hot query; return a description of any that scan or sort in memory"""
+    problems = []
+    for label, cursor in hot_queries(db, user_email):
+        try:
+            explain = cursor.explain()
+        except PyMongoError as e:
+            problems.append(f"{label}: explain failed ({e})")
+            continue
+        stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            problems.append(f"{label}: collection scan")
+        elif "SORT" in stages and label not in SORTED_IN_MEMORY:
+            problems.append(f"{label}: in-memory sort")
+    return problems
@@ -0,0 +1,166 @@
+"""Compact storage schema for dream documents
+
+Schema version 2 drops the conversation field, which only repeated
+dream_text and analysis, and compresses long analysis text with zlib (or
+zstd when the zstandard package is installed). dream_text stays plain
+because the text index and list previews read it on the server.
+
+Compressed values are stored as BSON binary with a user-defined subtype
+naming the codec, so DreamCodec.decode can expand them transparently.
+Documents written before the schema existed (version 1) decode unchanged.
+
+Each document also carries a content_hash of its date and text, which a
+unique index uses to keep imports from duplicating dreams.
+
+Existing documents are rewritten with the migration command, which works in
+batches, can be stopped and rerun at any point, and reports bytes saved:
+
+    python dream_schema.py [--batch-size N] [--dry-run]
+"""
+import argparse
+import hashlib
+import os
+import zlib
+
+import bson
+from bson.binary import Binary
+from pymongo import ReplaceOne
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SCHEMA_VERSION = 2
+COMPRESSED_FIELDS = ("analysis",)
+DROPPED_FIELDS = ("conversation",)
+
+# User-defined BSON binary subtypes, one per codec
+CODEC_SUBTYPES = {"zlib": 0x80, "zstd": 0x81}
+
+
+def content_hash(dream):
+    """Identity of a dream for duplicate detection: its date (to the millisecond, as stored) and text"""
+    date = dream["date"]
+    date = date.replace(microsecond=date.microsecond // 1000 * 1000)
+    payload = f"{date.isoformat()}\n{dream['dream_text']}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Dream text is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class DreamCodec:
+    """Converts dream documents to and from the compact schema"""
+
+    def __init__(self, codec="zlib", min_bytes=1024):
+        if codec == "zstd" and zstandard is None:
+            codec = "zlib"
+        self.codec = codec if codec in CODEC_SUBTYPES else None
+        self.min_bytes = min_bytes
+
+    def encode(self, dream):
+        """A copy of the dream in the compact schema"""
+        compact = {key: value for key, value in dream.items() if key not in DROPPED_FIELDS}
+        for field in COMPRESSED_FIELDS:
+            value = compact.get(field)
+            if self.codec and isinstance(value, str):
+                data = value.encode("utf-8")
+                if len(data) >= self.min_bytes:
+                    packed = compress(data, self.codec)
+                    # Short or incompressible text isn't worth the decode cost
+                    if len(packed) < len(data):
+                        compact[field] = Binary(packed, CODEC_SUBTYPES[self.codec])
+        if compact.get("date") and compact.get("dream_text"):
+            compact["content_hash"] = content_hash(compact)
+        compact["schema_version"] = SCHEMA_VERSION
+        return compact
+
+    def decode(self, dream):
+        """The dream with compressed fields expanded back to text; None passes through"""
+        if not dream:
+            return dream
+        for field in COMPRESSED_FIELDS:
+            value = dream.get(field)
+            if isinstance(value, Binary):
+                codec = next((name for name, subtype in CODEC_SUBTYPES.items() if subtype == value.subtype), None)
+                if codec:
+                    dream[field] = decompress(bytes(value), codec).decode("utf-8")
+        return dream
+
+
+def migrate(dreams_collection, codec, batch_size=500, dry_run=False, report=print):
+    """Rewrite documents older than SCHEMA_VERSION; return (documents, bytes before, bytes after)
+
+    Progress is never recorded separately: each batch selects documents
+    still below the current version in _id order, so an interrupted run
+    picks up where it stopped.
+    """
+    migrated = bytes_before = bytes_after = 0
+    last_id = None
+
+    # Matches documents without a schema_version too
+    outdated = {"schema_version": {"$not": {"$gte": SCHEMA_VERSION}}}
+
+    while True:
+        selector = dict(outdated, _id={"$gt": last_id}) if last_id is not None else outdated
+        batch = list(dreams_collection.find(selector).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        writes = []
+        for dream in batch:
+            compact = codec.encode(dream)
+            bytes_before += len(bson.encode(dream))
+            bytes_after += len(bson.encode(compact))
+            writes.append(compact)
+
+        if not dry_run:
+            # The version guard keeps a concurrent run from rewriting twice
+            dreams_collection.bulk_write(
+                [ReplaceOne(dict(outdated, _id=doc["_id"]), doc) for doc in writes],
+                ordered=False
+            )
+
+        migrated += len(batch)
+        last_id = batch[-1]["_id"]
+        report(f"{migrated} documents, {bytes_before - bytes_after} bytes saved so far")
+
+    return migrated, bytes_before, bytes_after
+
+
+def main():
+    import pymongo
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Migrate dream documents to the compact schema")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = pymongo.MongoClient(os.getenv("MONGO_URI"))
+    codec = DreamCodec(
+        codec=os.getenv("DREAM_COMPRESSION", "zlib"),
+        min_bytes=int(os.getenv("DREAM_COMPRESSION_MIN_BYTES", "1024"))
+    )
+
+    migrated, before, after = migrate(client["dream_analyst"]["dreams"], codec, args.batch_size, args.dry_run)
+    saved = before - after
+    percent = 100 * saved / before if before else 0
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {migrated} documents: {before} -> {after} bytes ({saved} saved, {percent:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Download files for single dreams and reports
+
+One serializer renders a dream as plain text, JSON or Markdown, so every
+download in the app has the same content and layout. Built files are kept
+in a small LRU keyed by the caller's notion of version (the dream id and
+the user's write version, or a content hash for unsaved analyses), so a
+file is only built again when what it describes has changed.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+FORMATS = {
+    "txt": {"mime": "text/plain", "label": "&#128221; Text"},
+    "json": {"mime": "application/json", "label": "&#128203; JSON"},
+    "md": {"mime": "text/markdown", "label": "&#128196; Markdown"}
+}
+
+# Field, heading; list fields are joined with commas in text and Markdown
+DREAM_SECTIONS = [
+    ("dream_text", "Dream"),
+    ("analysis", "Analysis"),
+    ("summary", "Summary"),
+    ("mood", "Mood"),
+    ("emotions", "Emotions"),
+    ("keywords", "Keywords")
+]
+
+
+def dream_record(dream, date=None):
+    """The exported fields of a dream, from a stored document or a fresh analysis"""
+    date = dream.get("date") or date or datetime.now()
+    record = {"date": date.isoformat(timespec="seconds") if isinstance(date, datetime) else date}
+    for field, _ in DREAM_SECTIONS:
+        if dream.get(field):
+            record[field] = dream[field]
+    return record
+
+
+def serialize(record, fmt, title="Dream Analysis Report"):
+    """Bytes of a record as txt, json or md
+
+    JSON takes any record; text and Markdown lay out the dream sections.
+    """
+    if fmt == "json":
+        return json.dumps(record, indent=2, default=str, ensure_ascii=False).encode("utf-8")
+
+    sections = []
+    for field, heading in DREAM_SECTIONS:
+        value = record.get(field)
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        sections.append((heading, str(value)))
+
+    date = str(record.get("date", ""))[:16].replace("T", " ")
+    if fmt == "md":
+        lines = [f"# {title}", "", f"*{date}*"]
+        for heading, value in sections:
+            lines += ["", f"## {heading}", "", value]
+    else:
+        lines = [title.upper(), "", f"Date: {date}"]
+        for heading, value in sections:
+            lines += ["", f"{heading}:", value]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def content_key(record):
+    """Version key for content that has no stored id"""
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    """Thread-safe LRU of built files, bounded by total size"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Cached bytes for key, calling build() on a miss"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        data = build()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
@@ -0,0 +1,91 @@
+"""Bounded background job queue
+
+Work that the user doesn't need to wait for (keyword extraction, database
+writes) is handed to a small pool of worker threads through a bounded queue.
+Job status can be polled by id, so a session can show progress on later
+reruns.
+"""
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue is at capacity"""
+
+
+class JobQueue:
+    """Fixed pool of daemon worker threads fed from a bounded queue"""
+
+    def __init__(self, workers=2, max_queue=100, max_finished=1000):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.max_finished = max_finished
+
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return the job id
+
+        Raises JobQueueFull instead of blocking when the queue is full.
+        """
+        job = {
+            "id": f"job-{next(self._ids)}",
+            "name": name,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+        try:
+            self._queue.put_nowait((job, fn, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job["id"]]
+            raise JobQueueFull(f"Background queue is full ({self._queue.maxsize} jobs)")
+        return job["id"]
+
+    def status(self, job_id):
+        """A copy of the job's state, or None if it is unknown or was pruned"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        """Queue depth and job counts by status"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"queued": self._queue.qsize(), "jobs": counts}
+
+    def _work(self):
+        while True:
+            job, fn, args, kwargs = self._queue.get()
+            with self._lock:
+                job["status"] = "running"
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                with self._lock:
+                    job.update(status="failed", error=str(e), finished_at=time.time())
+            else:
+                with self._lock:
+                    job.update(status="done", result=result, finished_at=time.time())
+            finally:
+                self._queue.task_done()
+                self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"]]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
@@ -0,0 +1,128 @@
+"""Whole-journal export and import as NDJSON or CSV
+
+Exports are generated row by row from a batched cursor, so only a batch of
+dream documents is loaded at a time; the encoded file itself is built in
+full, because Streamlit's download_button serves bytes and has no
+streaming response. Imports read the uploaded file (which Streamlit keeps
+in memory) a line at a time and insert in chunks with
+insert_many(ordered=False), so at most a chunk of parsed dreams is held;
+dreams that are already in the journal are recognised by their content
+hash (see dream_schema.content_hash) and skipped.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+EXPORT_FIELDS = ["date", "dream_text", "analysis", "mood", "emotions", "keywords", "summary"]
+LIST_FIELDS = ("emotions", "keywords")
+CSV_LIST_SEPARATOR = "; "
+
+FORMATS = {
+    "ndjson": {"mime": "application/x-ndjson", "extension": "ndjson"},
+    "csv": {"mime": "text/csv", "extension": "csv"}
+}
+
+
+def export_record(dream):
+    """The exported fields of a dream, with the date as ISO 8601"""
+    record = {field: dream.get(field) for field in EXPORT_FIELDS}
+    if isinstance(record["date"], datetime):
+        record["date"] = record["date"].isoformat(timespec="milliseconds")
+    return record
+
+
+def export_lines(dreams, fmt):
+    """Yield the export one line at a time"""
+    if fmt == "ndjson":
+        for dream in dreams:
+            yield json.dumps(export_record(dream), ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for dream in dreams:
+        record = export_record(dream)
+        for field in LIST_FIELDS:
+            record[field] = CSV_LIST_SEPARATOR.join(record[field] or [])
+        writer.writerow(record)
+        # Hand over what the writer produced and reuse the buffer
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_export(dreams, fmt, fileobj):
+    """Stream the export into a binary file object; return the number of dreams written"""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for dream in dreams:
+            count += 1
+            yield dream
+
+    for line in export_lines(counted(), fmt):
+        fileobj.write(line.encode("utf-8"))
+    return count
+
+
+def parse_record(record):
+    """A dream dict from an imported row; raises ValueError if it has no text or date"""
+    if not record.get("dream_text") or not record.get("date"):
+        raise ValueError("Each dream needs dream_text and date")
+
+    dream = {field: record.get(field) or None for field in EXPORT_FIELDS}
+    dream["date"] = datetime.fromisoformat(str(record["date"]))
+    for field in LIST_FIELDS:
+        value = dream[field] or []
+        dream[field] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR.strip())] if isinstance(value, str) else list(value)
+        dream[field] = [item for item in dream[field] if item]
+    # A missing mood stays missing, as in save_dream, rather than counting as neutral
+    dream["mood"] = dream["mood"].lower() if dream["mood"] else None
+    return dream
+
+
+def read_import(textfile, fmt):
+    """Yield (dream, None) or (None, error) for each row of a text file"""
+    rows = csv.DictReader(textfile) if fmt == "csv" else (line for line in textfile if line.strip())
+    for row in rows:
+        try:
+            yield parse_record(row if fmt == "csv" else json.loads(row)), None
+        except (ValueError, TypeError, AttributeError) as e:
+            yield None, str(e)
+
+
+def import_dreams(dream_repo, user_email, textfile, fmt, chunk_size=500, progress=None):
+    """Insert the dreams in a file in chunks; return counts of imported, duplicate and invalid rows
+
+    progress, if given, is called with the running counts after each chunk.
+    """
+    counts = {"imported": 0, "duplicates": 0, "invalid": 0}
+    chunk = []
+
+    def flush():
+        inserted, duplicates = dream_repo.insert_many(user_email, chunk)
+        counts["imported"] += inserted
+        counts["duplicates"] += duplicates
+        chunk.clear()
+        if progress:
+            progress(dict(counts))
+
+    for dream, error in read_import(textfile, fmt):
+        if error:
+            counts["invalid"] += 1
+            continue
+        chunk.append(dream)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    if counts["imported"]:
+        # One recount is cheaper than a stats update per imported dream
+        dream_repo.rebuild_stats(user_email)
+    return counts
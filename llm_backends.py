@@ -0,0 +1,222 @@
+"""LLM backends selected by configuration
+
+Every model call in the app goes through a backend with the same three
+operations: complete, stream and complete_json. MistralBackend talks to the
+real API; FakeBackend is a deterministic offline stand-in with configurable
+latency and failure injection for load testing and benchmarks.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+DEFAULT_MODEL = os.getenv("MISTRAL_MODEL", "mistral-large-latest")
+
+
+class LLMBackend:
+    """Common interface for chat model backends"""
+    name = "base"
+
+    def complete(self, model, messages, temperature, response_format=None, timeout=None, usage=None):
+        """Return the full response text
+
+        timeout is in seconds. If a usage dict is passed, it is filled with
+        prompt_tokens and completion_tokens.
+        """
+        raise NotImplementedError
+
+    def stream(self, model, messages, temperature, timeout=None, usage=None):
+        """Yield response text chunks as they arrive; usage is filled in at the end"""
+        raise NotImplementedError
+
+    def complete_json(self, model, messages, temperature):
+        """Return the parsed JSON object of a JSON-mode completion"""
+        return json.loads(self.complete(model, messages, temperature, {"type": "json_object"}))
+
+
+def record_usage(usage, response_usage):
+    """Copy token counts from an SDK usage object into a caller's usage dict"""
+    if usage is None or response_usage is None:
+        return
+    usage["prompt_tokens"] = getattr(response_usage, "prompt_tokens", 0) or 0
+    usage["completion_tokens"] = getattr(response_usage, "completion_tokens", 0) or 0
+
+
+class MistralBackend(LLMBackend):
+    """Backend for the Mistral chat API"""
+    name = "mistral"
+
+    def __init__(self, api_key):
+        from mistralai import Mistral
+        self.client = Mistral(api_key=api_key)
+
+    def complete(self, model, messages, temperature, response_format=None, timeout=None, usage=None):
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if response_format:
+            request["response_format"] = response_format
+        if timeout:
+            request["timeout_ms"] = int(timeout * 1000)
+        response = self.client.chat.complete(**request)
+        record_usage(usage, response.usage)
+        return response.choices[0].message.content
+
+    def stream(self, model, messages, temperature, timeout=None, usage=None):
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if timeout:
+            request["timeout_ms"] = int(timeout * 1000)
+        response = self.client.chat.stream(**request)
+        for event in response:
+            # The final chunk carries the token usage for the whole response
+            record_usage(usage, event.data.usage)
+            content = event.data.choices[0].delta.content
+            if isinstance(content, list):
+                content = "".join(getattr(chunk, "text", "") for chunk in content)
+            if content:
+                yield content
+
+
+class FakeBackendError(Exception):
+    """Injected failure from the fake backend"""
+
+    def __init__(self, message, status_code=503, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_latency(spec):
+    """Parse a latency distribution spec into a sampler returning seconds
+
+    Supported specs: "fixed:0.2", "uniform:0.1,0.8" and "lognormal:MU,SIGMA"
+    (parameters of the underlying normal, in log-seconds).
+    """
+    kind, _, params = (spec or "fixed:0").partition(":")
+    values = [float(value) for value in params.split(",") if value.strip()]
+
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend with configurable latency and failures
+
+    Outputs depend only on the request (and seed), so repeated requests get
+    identical answers. Canned responses can be supplied as a list of
+    {"match": substring, "response": text} rules checked against the last
+    user message; otherwise templated responses are generated.
+    """
+    name = "fake"
+
+    def __init__(self, latency="fixed:0", chunk_latency="fixed:0", failure_rate=0.0,
+                 failure_status=503, retry_after=None, seed=0, canned_responses=None, chunk_size=12):
+        self.sample_latency = parse_latency(latency)
+        self.sample_chunk_latency = parse_latency(chunk_latency)
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.seed = seed
+        self.canned_responses = canned_responses or []
+        self.chunk_size = chunk_size
+        self._jitter = random.Random(seed)
+
+    def _request_rng(self, model, messages, temperature, response_format=None):
+        payload = json.dumps([self.seed, model, messages, temperature, response_format], sort_keys=True, default=str)
+        return random.Random(hashlib.sha256(payload.encode()).hexdigest())
+
+    def _wait(self, timeout):
+        latency = self.sample_latency(self._jitter)
+        if timeout and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake backend timed out after {timeout}s")
+        time.sleep(latency)
+
+    def _maybe_fail(self):
+        if self.failure_rate and self._jitter.random() < self.failure_rate:
+            retry_after = self.retry_after if self.failure_status == 429 else None
+            raise FakeBackendError(f"Injected failure (HTTP {self.failure_status})", self.failure_status, retry_after)
+
+    def _respond(self, model, messages, temperature, response_format=None):
+        rng = self._request_rng(model, messages, temperature, response_format)
+        user_text = next((msg["content"] for msg in reversed(messages) if msg["role"] == "user"), "")
+
+        for rule in self.canned_responses:
+            if rule.get("match", "") in user_text:
+                return rule["response"]
+
+        words = [word.lower() for word in re.findall(r"[A-Za-z']{4,}", user_text)]
+        keywords = list(dict.fromkeys(sorted(words, key=lambda word: (-len(word), word))))[:6] or ["dream", "night"]
+
+        if response_format and response_format.get("type") == "json_object":
+            return json.dumps({
+                "mood": rng.choice(["positive", "neutral", "negative", "mysterious"]),
+                "emotions": rng.sample(["curiosity", "anxiety", "wonder", "joy", "sadness", "calm"], 2),
+                "keywords": keywords,
+                "summary": f"A dream about {', '.join(keywords[:3])}."
+            })
+
+        sentences = [
+            f"Thank you for sharing this. The images of {', '.join(keywords[:3])} stand out to me.",
+            "They often point to something you are working through in waking life.",
+            "Notice how the feelings in the dream shifted as it went on.",
+            "That shift can say as much as the symbols themselves.",
+            f"What comes to mind first when you think about {keywords[0]}?"
+        ]
+        return " ".join(sentences[:2] + rng.sample(sentences[2:4], rng.randint(0, 2)) + sentences[4:])
+
+    def _record_usage(self, usage, messages, text):
+        if usage is not None:
+            usage["prompt_tokens"] = sum(len(msg["content"]) for msg in messages) // 4
+            usage["completion_tokens"] = len(text) // 4
+
+    def complete(self, model, messages, temperature, response_format=None, timeout=None, usage=None):
+        self._wait(timeout)
+        self._maybe_fail()
+        text = self._respond(model, messages, temperature, response_format)
+        self._record_usage(usage, messages, text)
+        return text
+
+    def stream(self, model, messages, temperature, timeout=None, usage=None):
+        self._wait(timeout)
+        self._maybe_fail()
+        text = self._respond(model, messages, temperature)
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.sample_chunk_latency(self._jitter))
+            yield text[start:start + self.chunk_size]
+        self._record_usage(usage, messages, text)
+
+
+def create_llm_backend():
+    """Create the backend selected by LLM_BACKEND ("mistral" or "fake")
+
+    Returns None if the Mistral backend is selected without an API key.
+    """
+    backend = os.getenv("LLM_BACKEND", "mistral").lower()
+
+    if backend == "fake":
+        canned_responses = None
+        if os.getenv("FAKE_LLM_RESPONSES"):
+            with open(os.getenv("FAKE_LLM_RESPONSES")) as f:
+                canned_responses = json.load(f)
+        return FakeBackend(
+            latency=os.getenv("FAKE_LLM_LATENCY", "fixed:0"),
+            chunk_latency=os.getenv("FAKE_LLM_CHUNK_LATENCY", "fixed:0"),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            failure_status=int(os.getenv("FAKE_LLM_FAILURE_STATUS", "503")),
+            retry_after=float(os.getenv("FAKE_LLM_RETRY_AFTER")) if os.getenv("FAKE_LLM_RETRY_AFTER") else None,
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+            canned_responses=canned_responses
+        )
+
+    if backend == "mistral":
+        api_key = os.getenv("MISTRAL_API_KEY")
+        return MistralBackend(api_key) if api_key else None
+
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
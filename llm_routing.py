@@ -0,0 +1,101 @@
+"""Per-task model routing and call metrics
+
+Each LLM task (analysis, mood, keywords, ...) maps to an ordered list of
+models: the first is tried first and the rest are fallbacks. The routes can
+be overridden with the MODEL_ROUTES environment variable, a JSON object such
+as {"mood": ["mistral-small-latest", "mistral-large-latest"]}.
+"""
+import json
+import os
+import threading
+from collections import deque
+
+from llm_backends import DEFAULT_MODEL
+
+SMALL_MODEL = os.getenv("MISTRAL_SMALL_MODEL", "mistral-small-latest")
+
+# Free-form writing stays on the large model; constrained JSON tasks use the small one
+DEFAULT_ROUTES = {
+    "analysis": [DEFAULT_MODEL],
+    "followup": [DEFAULT_MODEL],
+    "therapist": [DEFAULT_MODEL],
+    "mood": [SMALL_MODEL, DEFAULT_MODEL],
+    "keywords": [SMALL_MODEL, DEFAULT_MODEL],
+    "structured": [SMALL_MODEL, DEFAULT_MODEL],
+    "summary": [SMALL_MODEL, DEFAULT_MODEL]
+}
+
+
+def load_routes():
+    """Default routes with any MODEL_ROUTES overrides applied; raises ValueError for a malformed override
+
+    Each task needs at least one model, or the completion helpers would have
+    nothing to try.
+    """
+    routes = dict(DEFAULT_ROUTES)
+    overrides = json.loads(os.getenv("MODEL_ROUTES") or "{}")
+    if not isinstance(overrides, dict):
+        raise ValueError("MODEL_ROUTES must be a JSON object mapping tasks to models")
+    for task, models in overrides.items():
+        models = [models] if isinstance(models, str) else models
+        if not isinstance(models, list) or not models or not all(isinstance(model, str) and model for model in models):
+            raise ValueError(f"MODEL_ROUTES[{task!r}] must be a model name or a non-empty list of model names")
+        routes[task] = models
+    return routes
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LLMMetrics:
+    """Per-task, per-model latency and token counters"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, task, model, latency, ok=True, prompt_tokens=0, completion_tokens=0, first_token_latency=None):
+        """Record one call; latencies are in seconds"""
+        with self._lock:
+            stats = self._stats.setdefault((task, model), {
+                "calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "latencies": deque(maxlen=self.window),
+                "first_token_latencies": deque(maxlen=self.window)
+            })
+            stats["calls"] += 1
+            if not ok:
+                stats["errors"] += 1
+                return
+            stats["prompt_tokens"] += prompt_tokens or 0
+            stats["completion_tokens"] += completion_tokens or 0
+            stats["latencies"].append(latency)
+            if first_token_latency is not None:
+                stats["first_token_latencies"].append(first_token_latency)
+
+    def snapshot(self):
+        """Summary rows per (task, model), suitable for a table"""
+        with self._lock:
+            rows = []
+            for (task, model), stats in sorted(self._stats.items()):
+                latencies = list(stats["latencies"])
+                rows.append({
+                    "task": task,
+                    "model": model,
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "p50_latency": percentile(latencies, 0.5),
+                    "p95_latency": percentile(latencies, 0.95),
+                    "p50_first_token": percentile(list(stats["first_token_latencies"]), 0.5),
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "completion_tokens": stats["completion_tokens"]
+                })
+            return rows
@@ -0,0 +1,312 @@
+"""Theme stylesheet and HTML templates for the pages
+
+Everything here is written readably and compacted once at import, so the
+markup sent to the browser on each rerun carries no indentation or line
+breaks. compact() joins stripped lines with nothing in between; every line
+of the stylesheet and templates ends at a tag, brace, semicolon or comma,
+so no tokens run together.
+
+The stylesheet is large enough to be cached by the browser session (see
+global.minCachedMessageSize in .streamlit/config.toml): it is sent in full
+on the first run, and every later rerun sends only its hash.
+"""
+
+
+def compact(source):
+    """Markup or CSS source with indentation and line breaks removed"""
+    return "".join(line.strip() for line in source.splitlines())
+
+
+THEME_CSS_SOURCE = """
+    <style>
+    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
+    
+    /* Main background with gradient */
+    .stApp {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        font-family: 'Poppins', sans-serif;
+    }
+    
+    /* Hide Streamlit elements */
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    
+    /* Custom title styling */
+    .dream-title {
+        font-size: 4rem;
+        font-weight: 700;
+        text-align: center;
+        background: linear-gradient(45deg, #FFD700, #FF69B4, #87CEEB);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        background-clip: text;
+        margin-bottom: 1rem;
+        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+        animation: glow 2s ease-in-out infinite alternate;
+    }
+    
+    @keyframes glow {
+        from { filter: drop-shadow(0 0 5px rgba(255, 215, 0, 0.5)); }
+        to { filter: drop-shadow(0 0 20px rgba(255, 105, 180, 0.8)); }
+    }
+    
+    /* Quote styling - only shown on homepage */
+    .dream-quote {
+        font-size: 1.3rem;
+        font-style: italic;
+        text-align: center;
+        color: #E6E6FA;
+        margin: 2rem 0;
+        padding: 1rem;
+        border-radius: 15px;
+        background: rgba(255, 255, 255, 0.1);
+        backdrop-filter: blur(10px);
+        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
+    }
+    
+    /* Button styling */
+    .stButton > button {
+        background: linear-gradient(45deg, #FF6B6B, #4ECDC4);
+        color: white;
+        border: none;
+        border-radius: 25px;
+        padding: 0.8rem 2rem;
+        font-size: 1.1rem;
+        font-weight: 600;
+        cursor: pointer;
+        transition: all 0.3s ease;
+        box-shadow: 0 4px 15px 0 rgba(31, 38, 135, 0.2);
+    }
+    
+    .stButton > button:hover {
+        transform: translateY(-3px);
+        box-shadow: 0 8px 25px 0 rgba(31, 38, 135, 0.3);
+        background: linear-gradient(45deg, #FF5252, #26C6DA);
+    }
+    
+    /* Card styling */
+    .dream-card {
+        background: rgba(255, 255, 255, 0.15);
+        backdrop-filter: blur(10px);
+        border-radius: 20px;
+        padding: 2rem;
+        margin: 1rem;
+        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
+        border: 1px solid rgba(255, 255, 255, 0.18);
+    }
+    
+    /* Hide empty dream cards */
+    .dream-card:empty {
+        display: none;
+    }
+    
+    /* Stats card styling */
+    .stats-card {
+        background: rgba(255, 255, 255, 0.2);
+        backdrop-filter: blur(15px);
+        border-radius: 15px;
+        padding: 1.5rem;
+        text-align: center;
+        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
+        border: 1px solid rgba(255, 255, 255, 0.18);
+        transition: transform 0.3s ease;
+    }
+    
+    .stats-card:hover {
+        transform: translateY(-5px);
+    }
+    
+    .stat-number {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #FFD700;
+        margin-bottom: 0.5rem;
+    }
+    
+    .stat-label {
+        font-size: 1rem;
+        color: #E6E6FA;
+        font-weight: 400;
+    }
+    
+    /* Input field styling */
+    .stTextInput > div > div > input {
+        background: rgba(255, 255, 255, 0.2);
+        border: 1px solid rgba(255, 255, 255, 0.3);
+        border-radius: 15px;
+        color: white;
+        padding: 0.8rem;
+    }
+    
+    .stTextArea > div > div > textarea {
+        background: rgba(255, 255, 255, 0.2);
+        border: 1px solid rgba(255, 255, 255, 0.3);
+        border-radius: 15px;
+        color: white;
+        padding: 0.8rem;
+    }
+    
+    /* Chat message styling */
+    .chat-message {
+        padding: 1rem;
+        border-radius: 15px;
+        margin: 1rem 0;
+        animation: fadeIn 0.5s ease-in;
+    }
+    
+    .user-message {
+        background: rgba(255, 107, 107, 0.3);
+        margin-left: 2rem;
+        border-left: 4px solid #FF6B6B;
+    }
+    
+    .analyst-message {
+        background: rgba(78, 205, 196, 0.3);
+        margin-right: 2rem;
+        border-left: 4px solid #4ECDC4;
+    }
+    
+    .therapist-message {
+        background: rgba(255, 182, 193, 0.3);
+        margin-right: 2rem;
+        border-left: 4px solid #FFB6C1;
+    }
+    
+    @keyframes fadeIn {
+        from { opacity: 0; transform: translateY(20px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
+    
+    /* Dream figure animation */
+    .dream-figure {
+        font-size: 8rem;
+        text-align: center;
+        animation: float 3s ease-in-out infinite;
+    }
+    
+    @keyframes float {
+        0%, 100% { transform: translateY(0px); }
+        50% { transform: translateY(-20px); }
+    }
+    
+    /* Success/error messages */
+    .success-message {
+        background: rgba(76, 175, 80, 0.3);
+        color: #E8F5E8;
+        padding: 1rem;
+        border-radius: 10px;
+        margin: 1rem 0;
+    }
+    
+    .error-message {
+        background: rgba(244, 67, 54, 0.3);
+        color: #FFEBEE;
+        padding: 1rem;
+        border-radius: 10px;
+        margin: 1rem 0;
+    }
+    
+    /* Share buttons */
+    .share-buttons {
+        display: flex;
+        gap: 10px;
+        justify-content: center;
+        margin: 1rem 0;
+    }
+    
+    .share-btn {
+        background: linear-gradient(45deg, #FF6B6B, #4ECDC4);
+        border: none;
+        border-radius: 25px;
+        padding: 0.8rem 1.5rem;
+        color: white !important;
+        text-decoration: none;
+        transition: all 0.3s ease;
+        font-weight: 600;
+        cursor: pointer;
+        display: inline-block;
+        text-align: center;
+        box-shadow: 0 4px 15px 0 rgba(31, 38, 135, 0.2);
+        margin: 0.5rem;
+    }
+    
+    .share-btn:hover {
+        background: linear-gradient(45deg, #FF5252, #26C6DA);
+        transform: translateY(-3px);
+        box-shadow: 0 8px 25px 0 rgba(31, 38, 135, 0.3);
+        color: white !important;
+        text-decoration: none;
+    }
+    
+    /* Mood indicator */
+    .mood-indicator {
+        display: inline-block;
+        padding: 0.3rem 0.8rem;
+        border-radius: 20px;
+        font-size: 0.9rem;
+        font-weight: 500;
+        margin: 0.2rem;
+    }
+    
+    .mood-positive { background: rgba(76, 175, 80, 0.4); color: #E8F5E8; }
+    .mood-neutral { background: rgba(255, 193, 7, 0.4); color: #FFF3C4; }
+    .mood-negative { background: rgba(244, 67, 54, 0.4); color: #FFEBEE; }
+    .mood-mysterious { background: rgba(156, 39, 176, 0.4); color: #F3E5F5; }
+    
+    /* White text for better visibility */
+    .white-text {
+        color: white !important;
+        font-weight: bold;
+    }
+    
+    /* Email display styling - FIXED */
+    .user-email {
+        color: white !important;
+        font-weight: bold;
+        font-size: 1.1rem;
+    }
+    
+    /* Remove empty box */
+    .empty-box {
+        display: none;
+    }
+    
+    /* Ensure all text in buttons is white */
+    a.share-btn, a.share-btn:visited, a.share-btn:hover {
+        color: white !important;
+    }
+    </style>
+"""
+THEME_CSS = compact(THEME_CSS_SOURCE)
+
+# Speaker label and CSS class for each chat role
+CHAT_ROLES = {
+    "user": ("You:", "user-message"),
+    "analyst": ("&#128302; Dream Analyst:", "analyst-message"),
+    "therapist": ("&#129489;&#8205;&#9877;&#65039; Therapist:", "therapist-message")
+}
+
+CHAT_MESSAGE = compact("""
+    <div class="chat-message {message_class}">
+        <strong>{speaker}</strong> {text}
+    </div>
+""")
+MOOD_BADGE = compact("""
+    <div class="mood-indicator mood-{mood}">{label}</div>
+""")
+SHARE_LINK = compact("""
+    <a href="{url}" target="_blank" class="share-btn">{label}</a>
+""")
+STATS_CARD = compact("""
+    <div class="stats-card">
+        <div class="stat-number">{value}</div>
+        <div class="stat-label">{label}</div>
+    </div>
+""")
+
+
+def chat_message(role, text):
+    """A chat bubble for a message from user, analyst or therapist"""
+    speaker, message_class = CHAT_ROLES[role]
+    return CHAT_MESSAGE.format(message_class=message_class, speaker=speaker, text=text)
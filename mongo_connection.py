@@ -0,0 +1,204 @@
+"""Background MongoDB connection management
+
+MongoConnectionManager connects from a daemon thread, so no page render
+waits on server selection. Until the first successful ping it keeps retrying
+with backoff, alternating the plain and TLS connection options; after that
+it keeps the same client (pymongo reconnects it on its own after an outage)
+and pings it periodically to report health. Pool settings come from the
+caller, and a pool event listener counts connections for the metrics view.
+
+pymongo itself is imported on the connection thread, so creating a manager
+costs a page render nothing.
+"""
+import threading
+import time
+
+# Tried in turn until one connects
+CONNECTION_OPTIONS = [
+    {},
+    {"tls": True, "tlsAllowInvalidCertificates": True}
+]
+
+
+class PoolMetrics:
+    """Connection pool counters fed by pymongo's pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "pool_cleared": 0
+        }
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self.counts[key] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts, open=self.counts["created"] - self.counts["closed"])
+
+    def listener(self):
+        """A pymongo pool listener that updates these counters"""
+        from pymongo import monitoring
+
+        metrics = self
+
+        class PoolListener(monitoring.ConnectionPoolListener):
+            def connection_created(self, event):
+                metrics.add("created")
+
+            def connection_closed(self, event):
+                metrics.add("closed")
+
+            def connection_checked_out(self, event):
+                metrics.add("checkouts")
+                metrics.add("checked_out")
+
+            def connection_checked_in(self, event):
+                metrics.add("checked_out", -1)
+
+            def connection_check_out_failed(self, event):
+                metrics.add("checkout_failures")
+
+            def pool_cleared(self, event):
+                metrics.add("pool_cleared")
+
+            # Events that need no counting
+            def pool_created(self, event):
+                pass
+
+            def pool_ready(self, event):
+                pass
+
+            def pool_closed(self, event):
+                pass
+
+            def connection_ready(self, event):
+                pass
+
+            def connection_check_out_started(self, event):
+                pass
+
+        return PoolListener()
+
+
+class MongoConnectionManager:
+    """Owns the process's MongoClient; connects and health-checks it in the background"""
+
+    def __init__(self, uri, client_options=None, health_interval=30.0, max_backoff=60.0, on_connect=None):
+        self.uri = uri
+        self.client_options = client_options or {}
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+        self.on_connect = on_connect
+        self.connect_result = None
+        self.pool_metrics = PoolMetrics()
+
+        self.client = None
+        self.state = "disabled" if not uri else "connecting"
+        self.last_error = None
+        self.last_ping_ms = None
+        self.last_check = None
+        self.consecutive_failures = 0
+        self._first_attempt = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Begin connecting in a daemon thread; returns self"""
+        if self.uri:
+            threading.Thread(target=self._run, name="mongo-connection", daemon=True).start()
+        else:
+            # Nothing to connect to, so there is no first attempt to wait for
+            self._first_attempt.set()
+        return self
+
+    def get_client(self, wait=0):
+        """The connected client, or None
+
+        Only the first connection attempt is worth waiting for: up to wait
+        seconds are spent on it, and nothing once it has finished.
+        """
+        if wait:
+            self._first_attempt.wait(wait)
+        return self.client
+
+    def status(self):
+        """Connection state, last ping and pool counters"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "last_ping_ms": self.last_ping_ms,
+                "last_check": self.last_check,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+                "pool": self.pool_metrics.snapshot()
+            }
+
+    def _ping(self, client):
+        start = time.perf_counter()
+        client.admin.command("ping")
+        return (time.perf_counter() - start) * 1000
+
+    def _record(self, state, ping_ms=None, error=None):
+        with self._lock:
+            self.state = state
+            self.last_check = time.time()
+            if error is None:
+                self.last_ping_ms = ping_ms
+                self.consecutive_failures = 0
+            else:
+                self.last_error = str(error)
+                self.consecutive_failures += 1
+
+    def _connect_once(self):
+        """Try each set of connection options; the connected client, or None"""
+        import pymongo
+
+        for options in CONNECTION_OPTIONS:
+            client = pymongo.MongoClient(
+                self.uri,
+                **options,
+                **self.client_options,
+                event_listeners=[self._pool_listener]
+            )
+            try:
+                ping_ms = self._ping(client)
+            except Exception as e:
+                client.close()
+                self._record("connecting", error=e)
+                continue
+            self._record("connected", ping_ms)
+            return client
+        return None
+
+    def _run(self):
+        self._pool_listener = self.pool_metrics.listener()
+        attempt = 0
+        while self.client is None:
+            client = self._connect_once()
+            if client is None:
+                self._first_attempt.set()
+                time.sleep(min(self.max_backoff, 2 ** attempt))
+                attempt += 1
+                continue
+            self.client = client
+            self._first_attempt.set()
+
+        if self.on_connect:
+            try:
+                self.connect_result = self.on_connect(self.client)
+            except Exception as e:
+                self.connect_result = [f"Startup tasks failed: {e}"]
+
+        while True:
+            time.sleep(self.health_interval)
+            try:
+                self._record("connected", self._ping(self.client))
+            except Exception as e:
+                # pymongo keeps rediscovering the servers; the next ping shows recovery
+                self._record("degraded", error=e)
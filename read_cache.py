@@ -0,0 +1,77 @@
+"""Per-user read-through cache for dashboard queries
+
+Streamlit reruns the whole dashboard on every widget interaction, so the
+same statistics, history page and previous-dream context are read again
+and again while nothing has changed. ReadCache keeps those results keyed by
+user, query and arguments, together with the user's write version. Writes
+bump the version, which makes every older entry for that user unreachable;
+a rerun with no new data is served without touching the database.
+
+Versions live in process memory. With several server processes a write in
+one is not seen by the others, so entries also expire after a TTL.
+"""
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReadCache:
+    """Thread-safe LRU of query results, invalidated per user by a version counter"""
+
+    def __init__(self, max_entries=2048, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, user_email):
+        with self._lock:
+            return self._versions.get(user_email, 0)
+
+    def bump(self, user_email):
+        """Invalidate everything cached for a user; call after each write"""
+        with self._lock:
+            self._versions[user_email] = self._versions.get(user_email, 0) + 1
+
+    def get_or_load(self, user_email, name, args, load, copy_value=True):
+        """Cached result of load() for this user, query name and arguments
+
+        The result is copied on the way in and out, so callers may modify
+        what they get back. Pass copy_value=False for large values that
+        callers only read, such as built figures.
+        """
+        clone = copy.deepcopy if copy_value else (lambda value: value)
+        with self._lock:
+            version = self._versions.get(user_email, 0)
+            key = (user_email, version, name, json.dumps(args, sort_keys=True, default=str))
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return clone(entry[0])
+            self.misses += 1
+
+        # Load outside the lock; concurrent misses for the same key just both query
+        value = load()
+        with self._lock:
+            self._entries[key] = (clone(value), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries)
+            }
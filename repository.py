@@ -0,0 +1,325 @@
+"""Data access for users and dreams
+
+Page code reads and writes through these repositories instead of the raw
+collections. Every read names a projection for its use case, so only the
+fields a view renders cross the wire, and every query is timed. Dashboard
+reads can be served from a ReadCache that dream writes invalidate. Dreams
+are stored in the compact schema from dream_schema and decoded on read.
+"""
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymongo
+
+from db_indexes import HISTORY_ORDER
+from dream_schema import DreamCodec
+from llm_routing import percentile
+from read_cache import ReadCache
+from user_stats import STATS_COLLECTION, rebuild_user_stats, record_dream
+
+CONTEXT_PREVIEW_CHARS = 150
+HISTORY_PREVIEW_CHARS = 300
+
+DREAM_FIELDS = ["date", "dream_text", "analysis", "mood", "emotions", "keywords", "summary"]
+
+DREAM_PROJECTIONS = {
+    # Previous dreams quoted in the analysis prompt
+    "context": {
+        "date": 1,
+        "dream_text": {"$substrCP": ["$dream_text", 0, CONTEXT_PREVIEW_CHARS]}
+    },
+    # Dream History list; one extra character tells whether the preview was cut short
+    "listing": {
+        "date": 1,
+        "mood": 1,
+        "emotions": 1,
+        "dream_text": {"$substrCP": ["$dream_text", 0, HISTORY_PREVIEW_CHARS + 1]}
+    },
+    # One dream opened in full
+    "detail": dict.fromkeys(DREAM_FIELDS, 1),
+    # Journal export, without internal ids
+    "export": dict(dict.fromkeys(DREAM_FIELDS, 1), _id=0)
+}
+
+USER_PROJECTIONS = {
+    "exists": {"_id": 1},
+    "auth": {"email": 1, "password": 1}
+}
+
+
+class QueryTimings:
+    """Per-query call counts, latencies and documents returned"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, documents=0):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "documents": 0, "latencies": deque(maxlen=self.window)})
+            stats["calls"] += 1
+            stats["documents"] += documents
+            stats["latencies"].append(seconds)
+
+    def snapshot(self):
+        """Summary rows per query, suitable for a table"""
+        with self._lock:
+            return [
+                {
+                    "query": name,
+                    "calls": stats["calls"],
+                    "documents": stats["documents"],
+                    "p50_ms": percentile([s * 1000 for s in stats["latencies"]], 0.5),
+                    "p95_ms": percentile([s * 1000 for s in stats["latencies"]], 0.95)
+                }
+                for name, stats in sorted(self._stats.items())
+            ]
+
+
+class Repository:
+    """Shared timing helpers"""
+
+    def __init__(self, collection, timings=None):
+        self.collection = collection
+        self.timings = timings or QueryTimings()
+
+    @contextmanager
+    def timed(self, name):
+        """Time a block; the block may set result["documents"]"""
+        result = {"documents": 0}
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            self.timings.record(name, time.perf_counter() - start, result["documents"])
+
+    def _fetch(self, name, cursor, batch_size=None):
+        """Run a cursor to completion under a timer"""
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        with self.timed(name) as timing:
+            documents = list(cursor)
+            timing["documents"] = len(documents)
+        return documents
+
+
+class UserRepository(Repository):
+    """Reads and writes on the users collection"""
+
+    def by_email(self, email, view="auth"):
+        """Cursor for the user with this email (also explained by db_indexes.check_query_plans)"""
+        return self.collection.find({"email": email}, USER_PROJECTIONS[view]).limit(1)
+
+    def find_by_email(self, email, view="auth"):
+        with self.timed(f"users.{view}") as timing:
+            user = next(self.by_email(email, view), None)
+            timing["documents"] = int(user is not None)
+        return user
+
+    def insert(self, user):
+        with self.timed("users.insert"):
+            return self.collection.insert_one(user).inserted_id
+
+    def record_login(self, email, when):
+        with self.timed("users.record_login"):
+            self.collection.update_one({"email": email}, {"$set": {"last_login": when}})
+
+
+class DreamRepository(Repository):
+    """Reads and writes on the dreams collection and the per-user stats kept beside it"""
+
+    def __init__(self, collection, timings=None, cache=None, codec=None):
+        super().__init__(collection, timings)
+        self.stats = collection.database[STATS_COLLECTION]
+        self.cache = cache or ReadCache(max_entries=0)
+        self.codec = codec or DreamCodec()
+
+    def insert(self, dream):
+        with self.timed("dreams.insert"):
+            inserted_id = self.collection.insert_one(self.codec.encode(dream)).inserted_id
+        self.cache.bump(dream["user_email"])
+        return inserted_id
+
+    def insert_many(self, user_email, dreams):
+        """Insert a batch of the user's dreams, skipping ones already stored; return (inserted, duplicates)
+
+        Duplicates are detected by the unique content_hash index, so the
+        rest of the batch still goes in.
+        """
+        documents = [self.codec.encode(dict(dream, user_email=user_email)) for dream in dreams]
+        with self.timed("dreams.insert_many") as timing:
+            try:
+                inserted = len(self.collection.insert_many(documents, ordered=False).inserted_ids)
+            except pymongo.errors.BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in errors):
+                    raise
+                inserted = e.details.get("nInserted", 0)
+            timing["documents"] = inserted
+        self.cache.bump(user_email)
+        return inserted, len(documents) - inserted
+
+    def set_keywords(self, user_email, dream_id, keywords):
+        """Fill in keywords that were pending when the dream was saved"""
+        with self.timed("dreams.set_keywords"):
+            self.collection.update_one(
+                {"_id": dream_id},
+                {"$set": {"keywords": keywords}, "$pull": {"pending_fields": "keywords"}}
+            )
+        self.cache.bump(user_email)
+
+    # The cursor builders below are the queries the read methods run; check_query_plans
+    # explains the same cursors, so the plan check can't drift from the app
+
+    def recent_cursor(self, user_email, limit=3, view="context"):
+        return self.collection.find({"user_email": user_email}, DREAM_PROJECTIONS[view]).sort(HISTORY_ORDER).limit(limit)
+
+    def get_cursor(self, user_email, dream_id, view="detail"):
+        return self.collection.find({"_id": dream_id, "user_email": user_email}, DREAM_PROJECTIONS[view]).limit(1)
+
+    def list_cursor(self, user_email, date_range=None, mood=None, view="listing", after=None, limit=0):
+        """Filtered dreams newest first; after is the last dream of the previous page"""
+        query = filter_query(user_email, date_range, mood)
+        if after is not None:
+            query = {"$and": [query, keyset_after(after)]}
+        return self.collection.find(query, DREAM_PROJECTIONS[view]).sort(HISTORY_ORDER).limit(limit)
+
+    def text_cursor(self, user_email, words, date_range=None, mood=None, view="listing", skip=0, limit=0):
+        """Filtered dreams matching words through the text index, most relevant first"""
+        text_query = dict(filter_query(user_email, date_range, mood), **{"$text": {"$search": " ".join(words)}})
+        scored = dict(DREAM_PROJECTIONS[view], score={"$meta": "textScore"})
+        cursor = self.collection.find(text_query, scored).sort([("score", {"$meta": "textScore"}), ("date", pymongo.DESCENDING)])
+        return cursor.skip(skip).limit(limit)
+
+    def export_cursor(self, user_email, view="export"):
+        return self.collection.find({"user_email": user_email}, DREAM_PROJECTIONS[view]).sort("date", pymongo.ASCENDING)
+
+    def stats_cursor(self, user_email):
+        return self.stats.find({"_id": user_email}).limit(1)
+
+    def recent(self, user_email, limit=3, view="context", batch_size=None):
+        """The user's newest dreams"""
+        def load():
+            return self._fetch(f"dreams.recent.{view}", self.recent_cursor(user_email, limit, view), batch_size)
+        return self.cache.get_or_load(user_email, "recent", [limit, view], load)
+
+    def get(self, user_email, dream_id, view="detail"):
+        """One of the user's dreams, or None"""
+        def load():
+            with self.timed(f"dreams.get.{view}") as timing:
+                dream = next(self.get_cursor(user_email, dream_id, view), None)
+                timing["documents"] = int(dream is not None)
+            return self.codec.decode(dream)
+        return self.cache.get_or_load(user_email, "get", [dream_id, view], load)
+
+    def search(self, user_email, words=None, date_range=None, mood=None, view="listing",
+               after=None, skip=0, limit=0, batch_size=None):
+        """The user's dreams matching the filters
+
+        Without words, dreams come newest first and after is the last dream
+        of the previous page (keyset paging on date, _id). With words, they
+        are matched through the text index and ranked by relevance; that
+        order has no stable key, so those pages use skip.
+        """
+        after_key = [after["date"], after["_id"]] if after else None
+        args = [words, date_range, mood, view, after_key, skip, limit]
+        return self.cache.get_or_load(
+            user_email, "search", args,
+            lambda: self._search(user_email, words, date_range, mood, view, after, skip, limit, batch_size)
+        )
+
+    def _search(self, user_email, words, date_range, mood, view, after, skip, limit, batch_size):
+        if not words:
+            cursor = self.list_cursor(user_email, date_range, mood, view, after, limit)
+            return self._fetch(f"dreams.list.{view}", cursor, batch_size)
+
+        try:
+            cursor = self.text_cursor(user_email, words, date_range, mood, view, skip, limit)
+            return self._fetch(f"dreams.search.{view}", cursor, batch_size)
+        except pymongo.errors.OperationFailure:
+            # No text index yet (provisioning failed); match the words literally instead
+            pattern = "|".join(re.escape(word) for word in words)
+            query = filter_query(user_email, date_range, mood)
+            query["$or"] = [
+                {"dream_text": {"$regex": pattern, "$options": "i"}},
+                {"keywords": {"$regex": pattern, "$options": "i"}}
+            ]
+            cursor = self.collection.find(query, DREAM_PROJECTIONS[view]).sort(HISTORY_ORDER).skip(skip).limit(limit)
+            return self._fetch(f"dreams.search_regex.{view}", cursor, batch_size)
+
+    def export(self, user_email, view="export", batch_size=200):
+        """Iterate over all of the user's dreams, oldest first, a batch at a time"""
+        cursor = self.export_cursor(user_email, view)
+        with self.timed(f"dreams.export.{view}") as timing:
+            for dream in cursor.batch_size(batch_size):
+                timing["documents"] += 1
+                yield self.codec.decode(dream)
+
+    def user_stats(self, user_email):
+        """The user's stats document, rebuilt from their dreams if it doesn't exist yet"""
+        return self.cache.get_or_load(user_email, "user_stats", [], lambda: self._user_stats(user_email))
+
+    def _user_stats(self, user_email):
+        with self.timed("user_stats.get") as timing:
+            stats = next(self.stats_cursor(user_email), None)
+            timing["documents"] = int(stats is not None)
+        if stats is None:
+            # Journals started before user_stats existed are backfilled on first view
+            with self.timed("user_stats.rebuild"):
+                stats = rebuild_user_stats(self.collection, user_email, overwrite=False)
+        elif stats.get("stale") or "total" not in stats:
+            # A stats update failed and so did the rebuild after it (see record_stats)
+            with self.timed("user_stats.rebuild"):
+                stats = rebuild_user_stats(self.collection, user_email)
+        return stats
+
+    def rebuild_stats(self, user_email):
+        """Recompute the user's stats document from their dreams"""
+        with self.timed("user_stats.rebuild"):
+            rebuild_user_stats(self.collection, user_email)
+        self.cache.bump(user_email)
+
+    def record_stats(self, user_email, **counts):
+        """Add a saved dream to the user's stats document
+
+        If the update fails the document is rebuilt from the user's dreams
+        rather than left with counts that silently miss a dream. If that
+        fails too it is marked stale for the next dashboard view to rebuild;
+        it is kept rather than dropped, so a later save can't upsert a new
+        document that counts only the dreams saved after it.
+        """
+        try:
+            with self.timed("user_stats.record"):
+                record_dream(self.stats, user_email, **counts)
+        except pymongo.errors.PyMongoError:
+            try:
+                self.rebuild_stats(user_email)
+            except pymongo.errors.PyMongoError:
+                try:
+                    self.stats.update_one({"_id": user_email}, {"$set": {"stale": True}}, upsert=True)
+                except pymongo.errors.PyMongoError:
+                    pass
+        finally:
+            self.cache.bump(user_email)
+
+
+def filter_query(user_email, date_range=None, mood=None):
+    """The Dream History filters as a query on the user's dreams"""
+    query = {"user_email": user_email}
+    if date_range:
+        query["date"] = {"$gte": date_range[0], "$lte": date_range[1]}
+    if mood:
+        query["mood"] = mood
+    return query
+
+
+def keyset_after(dream):
+    """Filter for the dreams that come after this one in Dream History order"""
+    return {"$or": [
+        {"date": {"$lt": dream["date"]}},
+        {"date": dream["date"], "_id": {"$lt": dream["_id"]}}
+    ]}
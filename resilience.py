@@ -0,0 +1,181 @@
+"""Retries, timeouts and circuit breaking for LLM backend calls
+
+ResilientBackend wraps any backend from llm_backends. Each call gets a
+timeout; retryable failures (429, 5xx, timeouts, connection errors) are
+retried with jittered exponential backoff that honours Retry-After; and a
+circuit breaker per model, shared by all sessions, fails fast while that
+model is degraded so routing can move on to a fallback model.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from llm_backends import LLMBackend
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while the circuit is open"""
+
+
+def is_retryable(exc):
+    """Whether a failed call is worth retrying"""
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # Transport errors (timeouts, resets) raised through the SDK's HTTP client
+    return type(exc).__module__.split(".")[0] in ("httpx", "httpcore")
+
+
+def retry_after_seconds(exc):
+    """Seconds to wait according to a Retry-After header, if the error has one"""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "raw_response", None), "headers", None)
+        value = headers.get("retry-after") if headers is not None else None
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Timeout and backoff settings for one call"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, timeout=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def delay(self, attempt, exc, rng=random):
+        """Delay before the next attempt, or None if the error says not to retry so soon"""
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            # Waiting longer than max_delay would hold a script thread too long
+            return retry_after if retry_after <= self.max_delay else None
+        # Full jitter keeps sessions from retrying in lockstep
+        return rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError("LLM provider is degraded; failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that neither succeeded nor indicated provider trouble"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientBackend(LLMBackend):
+    """Backend wrapper adding timeouts, retries and a circuit breaker"""
+
+    def __init__(self, backend, policy=None, breaker_factory=CircuitBreaker, sleep=time.sleep):
+        self.backend = backend
+        self.name = backend.name
+        self.policy = policy or RetryPolicy()
+        self.breaker_factory = breaker_factory
+        self.breakers = {}
+        self._breakers_lock = threading.Lock()
+        self.sleep = sleep
+
+    def breaker(self, model):
+        """The circuit breaker for one model"""
+        with self._breakers_lock:
+            if model not in self.breakers:
+                self.breakers[model] = self.breaker_factory()
+            return self.breakers[model]
+
+    def _handle_failure(self, breaker, attempt, exc):
+        """Record a failure and wait before retrying, or re-raise"""
+        if not is_retryable(exc):
+            breaker.release()
+            raise exc
+        breaker.record_failure()
+        delay = self.policy.delay(attempt, exc) if attempt + 1 < self.policy.max_attempts else None
+        if delay is None:
+            raise exc
+        self.sleep(delay)
+
+    def complete(self, model, messages, temperature, response_format=None, timeout=None, usage=None):
+        breaker = self.breaker(model)
+        for attempt in range(self.policy.max_attempts):
+            breaker.before_call()
+            try:
+                result = self.backend.complete(model, messages, temperature, response_format, timeout=timeout or self.policy.timeout, usage=usage)
+            except Exception as exc:
+                self._handle_failure(breaker, attempt, exc)
+                continue
+            breaker.record_success()
+            return result
+
+    def stream(self, model, messages, temperature, timeout=None, usage=None):
+        # Retry only until the first chunk arrives; after that the caller has
+        # already shown partial output
+        breaker = self.breaker(model)
+        for attempt in range(self.policy.max_attempts):
+            breaker.before_call()
+            try:
+                chunks = iter(self.backend.stream(model, messages, temperature, timeout=timeout or self.policy.timeout, usage=usage))
+                first_chunk = next(chunks)
+            except StopIteration:
+                breaker.record_success()
+                return
+            except Exception as exc:
+                self._handle_failure(breaker, attempt, exc)
+                continue
+            breaker.record_success()
+            yield first_chunk
+            yield from chunks
+            return
@@ -0,0 +1,31 @@
+"""The labelled crisis corpus from benchmarks/crisis_bench.py, run as tests"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from crisis_bench import CORPUS, COUNTRY_CORPUS  # noqa: E402
+
+from crisis import detect_crisis, find_country, find_crisis_matches  # noqa: E402
+
+
+@pytest.mark.parametrize("text, expected, categories", CORPUS)
+def test_crisis_corpus(text, expected, categories):
+    assert detect_crisis(text) == expected
+    assert {match["category"] for match in find_crisis_matches(text)} == categories
+
+
+@pytest.mark.parametrize("text, expected", COUNTRY_CORPUS)
+def test_country_corpus(text, expected):
+    assert find_country(text) == expected
+
+
+def test_matches_report_positions_in_the_original_text():
+    text = "I feel HOPELESS and want to DIE"
+
+    matches = find_crisis_matches(text)
+
+    assert [(match["phrase"], match["category"]) for match in matches] == [("HOPELESS", "hopelessness"), ("DIE", "death")]
+    assert all(text[match["start"]:match["end"]] == match["phrase"] for match in matches)
@@ -0,0 +1,27 @@
+"""MODEL_ROUTES overrides"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from llm_routing import DEFAULT_ROUTES, load_routes  # noqa: E402
+
+
+def test_overrides_replace_default_routes(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTES", '{"mood": "mistral-large-latest", "summary": ["a", "b"]}')
+
+    routes = load_routes()
+
+    assert routes["mood"] == ["mistral-large-latest"]
+    assert routes["summary"] == ["a", "b"]
+    assert routes["analysis"] == DEFAULT_ROUTES["analysis"]
+
+
+@pytest.mark.parametrize("overrides", ['{"mood": []}', '{"mood": {"model": "a"}}', '{"mood": [""]}', '["mood"]'])
+def test_malformed_overrides_are_rejected(monkeypatch, overrides):
+    monkeypatch.setenv("MODEL_ROUTES", overrides)
+
+    with pytest.raises(ValueError):
+        load_routes()
@@ -0,0 +1,70 @@
+"""MistralBackend streaming through ResilientBackend, against a stub SDK client"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from llm_backends import MistralBackend  # noqa: E402
+from resilience import CircuitBreaker, ResilientBackend, RetryPolicy  # noqa: E402
+
+
+def event(content, usage=None):
+    """A stream event shaped like the Mistral SDK's CompletionEvent"""
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(data=SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=usage))
+
+
+class StubChat:
+    def __init__(self, events):
+        self.events = events
+        self.requests = []
+
+    def stream(self, **request):
+        self.requests.append(request)
+        return iter(self.events)
+
+
+def mistral_backend(events):
+    # Skip __init__ so the test needs neither the SDK nor an API key
+    backend = MistralBackend.__new__(MistralBackend)
+    backend.client = SimpleNamespace(chat=StubChat(events))
+    return backend
+
+
+def test_stream_yields_chunks_and_records_usage():
+    backend = mistral_backend([
+        event("Water "),
+        event("means "),
+        event("emotion.", usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+    ])
+    resilient = ResilientBackend(backend, RetryPolicy(timeout=5), sleep=lambda seconds: None)
+    usage = {}
+
+    chunks = list(resilient.stream("mistral-small-latest", [{"role": "user", "content": "hi"}], 0.7, usage=usage))
+
+    assert chunks == ["Water ", "means ", "emotion."]
+    assert usage == {"prompt_tokens": 12, "completion_tokens": 3}
+    assert backend.client.chat.requests[0]["timeout_ms"] == 5000
+    assert resilient.breaker("mistral-small-latest").state == "closed"
+
+
+def test_stream_call_error_releases_half_open_breaker():
+    class BrokenBackend:
+        name = "broken"
+
+        def stream(self, model, messages, temperature, timeout=None):
+            return iter(())
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.opened_at = time.monotonic()
+    resilient = ResilientBackend(BrokenBackend(), RetryPolicy(), breaker_factory=lambda: breaker, sleep=lambda seconds: None)
+
+    with pytest.raises(TypeError):
+        list(resilient.stream("model", [], 0.7, usage={}))
+
+    # The trial call ended, so the next one may go through
+    breaker.before_call()
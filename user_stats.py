@@ -0,0 +1,171 @@
+"""Incrementally maintained per-user dream statistics
+
+Each user has one document in the user_stats collection holding running
+counters: total dreams, latest date, and per-keyword, mood, emotion and
+month counts. save_dream updates it with a single $inc/$max, so the
+dashboard reads its statistics with one point lookup however large the
+journal is.
+
+The document can always be recomputed from the dreams collection, lazily
+the first time a user without one opens the dashboard, or for everyone with
+
+    python user_stats.py [--user EMAIL]
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+
+STATS_COLLECTION = "user_stats"
+# The moods the analysis assigns, and so the keys of the moods counter
+MOOD_OPTIONS = ["positive", "neutral", "negative", "mysterious"]
+COUNTER_FIELDS = ("keywords", "moods", "emotions", "months")
+
+
+def encode_key(value):
+    """Make a value safe to use as a field name ('.' and '$' are not allowed)"""
+    return str(value).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def decode_key(key):
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def stats_collection(dreams_collection):
+    """The user_stats collection that lives next to the dreams collection"""
+    return dreams_collection.database[STATS_COLLECTION]
+
+
+def stats_update(date=None, keywords=(), mood=None, emotions=()):
+    """The update that adds one dream, or keywords filled in later, to a stats document"""
+    increments = {}
+
+    def count(field, value):
+        path = f"{field}.{encode_key(value)}"
+        increments[path] = increments.get(path, 0) + 1
+
+    if date is not None:
+        increments["total"] = 1
+        count("months", date.strftime("%Y-%m"))
+    for keyword in keywords or []:
+        count("keywords", keyword)
+    if mood:
+        count("moods", mood)
+    for emotion in emotions or []:
+        count("emotions", emotion)
+
+    update = {"$inc": increments}
+    if date is not None:
+        update["$max"] = {"latest": date}
+    return update if increments else None
+
+
+def record_dream(stats, user_email, **counts):
+    """Apply stats_update(**counts) to a user's document
+
+    A new dream creates the document if needed. Keywords filled in later
+    only update an existing one: a document made of them alone would have
+    no total and hide the user's statistics.
+    """
+    update = stats_update(**counts)
+    if update:
+        stats.update_one({"_id": user_email}, update, upsert=counts.get("date") is not None)
+
+
+def top_counts(counter, limit):
+    """The most common (value, count) pairs of a counter sub-document"""
+    pairs = [(decode_key(key), count) for key, count in (counter or {}).items() if count > 0]
+    return sorted(pairs, key=lambda pair: (-pair[1], pair[0]))[:limit]
+
+
+def summarize_stats(doc, now=None):
+    """Dashboard statistics from a stats document, or None if the user has no dreams"""
+    if not doc or not doc.get("total"):
+        return None
+
+    now = now or datetime.now()
+    # Month counters can't be split, so the 6-month window starts on a month boundary
+    first_month = (now - timedelta(days=180)).strftime("%Y-%m")
+
+    return {
+        "total_dreams": doc["total"],
+        "days_since_last": (now - doc["latest"]).days,
+        "most_common_keywords": top_counts(doc.get("keywords"), 5),
+        "mood_distribution": dict(top_counts(doc.get("moods"), None)),
+        "most_common_emotions": top_counts(doc.get("emotions"), 3),
+        "monthly_counts": {
+            month: count for month, count in sorted(top_counts(doc.get("months"), None)) if month >= first_month
+        }
+    }
+
+
+def _counter_stage(field):
+    return [
+        {"$unwind": f"${field}"},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}
+    ]
+
+
+def compute_user_stats(dreams_collection, user_email):
+    """A stats document for one user, computed from scratch with one aggregation"""
+    pipeline = [
+        {"$match": {"user_email": user_email}},
+        {"$facet": {
+            "summary": [{"$group": {"_id": None, "total": {"$sum": 1}, "latest": {"$max": "$date"}}}],
+            "keywords": _counter_stage("keywords"),
+            "emotions": _counter_stage("emotions"),
+            "moods": [
+                {"$match": {"mood": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$mood", "count": {"$sum": 1}}}
+            ],
+            "months": [
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$date"}}, "count": {"$sum": 1}}}
+            ]
+        }}
+    ]
+    result = next(dreams_collection.aggregate(pipeline), None) or {}
+    summary = (result.get("summary") or [{"total": 0, "latest": None}])[0]
+
+    doc = {"_id": user_email, "total": summary["total"], "latest": summary["latest"]}
+    for field in COUNTER_FIELDS:
+        doc[field] = {encode_key(row["_id"]): row["count"] for row in result.get(field, []) if row["_id"] is not None}
+    return doc
+
+
+def rebuild_user_stats(dreams_collection, user_email, overwrite=True):
+    """Recompute and store a user's stats document; return it
+
+    With overwrite=False an existing document is left alone, which is what
+    the lazy backfill wants when a save has raced it.
+    """
+    doc = compute_user_stats(dreams_collection, user_email)
+    stats = stats_collection(dreams_collection)
+    if overwrite:
+        stats.replace_one({"_id": user_email}, doc, upsert=True)
+        return doc
+
+    fields = {key: value for key, value in doc.items() if key != "_id"}
+    stats.update_one({"_id": user_email}, {"$setOnInsert": fields}, upsert=True)
+    return stats.find_one({"_id": user_email})
+
+
+def main():
+    import pymongo
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Rebuild per-user dream statistics from the dreams collection")
+    parser.add_argument("--user", help="Only rebuild this user's statistics")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = pymongo.MongoClient(os.getenv("MONGO_URI"))
+    dreams_collection = client["dream_analyst"]["dreams"]
+
+    users = [args.user] if args.user else dreams_collection.distinct("user_email")
+    for user_email in users:
+        doc = rebuild_user_stats(dreams_collection, user_email)
+        print(f"{user_email}: {doc['total']} dreams")
+    print(f"Rebuilt statistics for {len(users)} users")
+
+
+if __name__ == "__main__":
+    main()